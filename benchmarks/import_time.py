@@ -0,0 +1,87 @@
+"""
+Import-time benchmark.
+
+Imports every module in a fresh interpreter with -X importtime and checks its cold import time against a
+budget. The cold time is the first run of a module, which is what an entry point pays. It is gated on, and
+the fastest of the --repeat runs is reported next to it as the warm time. Exits with status 1 when any
+module is over budget.
+
+A fresh interpreter does not clear the OS page cache, so files read by earlier processes (an earlier
+module of the same run, the test suite) can make the first run faster than a true cold start.
+--drop-caches drops the page cache before every cold run, which needs root on Linux.
+
+    python -m benchmarks.import_time
+    python -m benchmarks.import_time --budget-ms 800 --modules shipping_price.entity.config_entity
+    sudo python -m benchmarks.import_time --drop-caches
+
+The slowest imports of a module over budget are listed so that the offending dependency is easy to find.
+"""
+import argparse
+import os
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+DEFAULT_MODULES = [
+    "shipping_price.constant",
+    "shipping_price.utils.main_utils",
+    "shipping_price.entity.config_entity",
+    "shipping_price.pipeline.training_pipeline",
+]
+DEFAULT_BUDGET_MS = 1000.0
+N_SLOWEST_IMPORTS = 10
+
+
+def measure_import(module: str) -> Tuple[float, List[Tuple[float, str]]]:
+    # Returns the cumulative import time of module in ms and the cumulative time of every import in it
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    imports = []
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        _, cumulative, name = line[len("import time:") :].split("|")
+        imports.append((int(cumulative) / 1000, name.strip()))
+    total = next(cumulative for cumulative, name in imports if name == module)
+    return total, imports
+
+
+def drop_page_cache() -> None:
+    # Writing dirty pages first, only clean pages are dropped
+    os.sync()
+    with open("/proc/sys/vm/drop_caches", "w") as drop_caches:
+        drop_caches.write("3\n")
+
+
+def run(modules: List[str], budget_ms: float, repeat: int, drop_caches: bool = False) -> Dict[str, float]:
+    results, over_budget = {}, False
+    for module in modules:
+        if drop_caches:
+            drop_page_cache()
+        total, imports = measure_import(module)
+        warm = min([total] + [measure_import(module)[0] for _ in range(repeat - 1)])
+        results[module] = total
+        status = "ok" if total <= budget_ms else "OVER BUDGET"
+        print(f"{module:<50} cold {total:>9.1f} ms  warm {warm:>9.1f} ms  {status}")
+        if total > budget_ms:
+            over_budget = True
+            for cumulative, name in sorted(imports, reverse=True)[1 : N_SLOWEST_IMPORTS + 1]:
+                print(f"    {name:<46} {cumulative:>9.1f} ms")
+    if over_budget:
+        print(f"Import time budget of {budget_ms:.0f} ms exceeded")
+        sys.exit(1)
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modules", nargs="+", default=DEFAULT_MODULES)
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--drop-caches", action="store_true")
+    args = parser.parse_args()
+    run(args.modules, args.budget_ms, args.repeat, args.drop_caches)
@@ -0,0 +1,137 @@
+"""
+Ingestion benchmark.
+
+Loads synthetic shipments into MongoDB and times DataIngestion.initiate_data_ingestion end to end,
+reporting rows/sec, peak RSS and time per phase. Every scale runs in its own process so that peak RSS
+is not carried over from the previous scale.
+
+    python -m benchmarks.ingestion_benchmark --rows 100000 1000000
+    python -m benchmarks.ingestion_benchmark --rows 10000000 --mongo-url mongodb://localhost:27017
+
+Without --mongo-url an in-memory mongomock client is used, which is fine for the smaller scales.
+Fetch time includes the column drop and the dropna, both run inside MongoDB by the aggregation pipeline.
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from functools import wraps
+from pymongo import MongoClient
+from benchmarks.synthetic_data import iter_shipment_chunks
+from shipping_price.components.data_ingestion import DataIngestion
+from shipping_price.configuration.mongo_operations import MongoDBOperation
+from shipping_price.entity.config_entity import DataIngestionConfig
+
+BENCHMARK_DB_NAME = "shipping_price_benchmark"
+BENCHMARK_COLLECTION_NAME = "shipments"
+DEFAULT_SCALES = [100000, 1000000, 10000000]
+
+
+def timed(phase_times: dict, phase: str, func):
+    # Wrapping a bound method to add its wall time to phase_times[phase]
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        start_time = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            phase_times[phase] += time.perf_counter() - start_time
+
+    return wrapper
+
+
+def get_peak_rss_mb() -> float:
+    # ru_maxrss is in kilobytes on linux and in bytes on macOS
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak_rss / 1024 ** 2 if sys.platform == "darwin" else peak_rss / 1024
+
+
+def run_scale(n_rows: int, mongo_url: str = None, null_fraction: float = 0.05) -> dict:
+    if mongo_url is None:
+        import mongomock
+
+        client = mongomock.MongoClient()
+    else:
+        client = MongoClient(mongo_url)
+    mongo_op = MongoDBOperation(client=client)
+
+    # Loading the synthetic shipments
+    client[BENCHMARK_DB_NAME].drop_collection(BENCHMARK_COLLECTION_NAME)
+    load_start = time.perf_counter()
+    for chunk in iter_shipment_chunks(n_rows, null_fraction=null_fraction):
+        mongo_op.insert_dataframe_as_record(chunk, BENCHMARK_DB_NAME, BENCHMARK_COLLECTION_NAME)
+    load_seconds = time.perf_counter() - load_start
+
+    with tempfile.TemporaryDirectory() as artifacts_dir:
+        config = DataIngestionConfig()
+        config.DB_NAME = BENCHMARK_DB_NAME
+        config.COLLECTION_NAME = BENCHMARK_COLLECTION_NAME
+        config.INCREMENTAL_INGESTION = False
+        config.DATA_INGESTION_ARTIFACTS_DIR = artifacts_dir
+        config.TRAIN_DATA_ARTIFACTS_FILE_DIR = os.path.join(artifacts_dir, "Train")
+        config.TEST_DATA_ARTIFACTS_FILE_DIR = os.path.join(artifacts_dir, "Test")
+        config.TRAIN_DATA_FILE_PATH = os.path.join(config.TRAIN_DATA_ARTIFACTS_FILE_DIR, "train.parquet")
+        config.TEST_DATA_FILE_PATH = os.path.join(config.TEST_DATA_ARTIFACTS_FILE_DIR, "test.parquet")
+        config.COLUMN_STATISTICS_FILE_PATH = os.path.join(artifacts_dir, "column_statistics.json")
+
+        # Instrumenting every phase of the ingestion
+        phase_times = defaultdict(float)
+        data_ingestion = DataIngestion(data_ingestion_config=config, mongo_op=mongo_op)
+        data_ingestion.get_data_from_mongodb = timed(phase_times, "fetch", data_ingestion.get_data_from_mongodb)
+        data_ingestion.apply_memory_plan = timed(phase_times, "memory_plan", data_ingestion.apply_memory_plan)
+        data_ingestion.split_chunk = timed(phase_times, "split", data_ingestion.split_chunk)
+        data_ingestion.save_column_statistics = timed(
+            phase_times, "column_statistics", data_ingestion.save_column_statistics
+        )
+        config.UTILS.save_dataframe = timed(phase_times, "write", config.UTILS.save_dataframe)
+
+        ingestion_start = time.perf_counter()
+        data_ingestion.initiate_data_ingestion()
+        ingestion_seconds = time.perf_counter() - ingestion_start
+
+    return {
+        "rows": n_rows,
+        "load_seconds": round(load_seconds, 3),
+        "ingestion_seconds": round(ingestion_seconds, 3),
+        "rows_per_sec": round(n_rows / ingestion_seconds, 1),
+        "peak_rss_mb": round(get_peak_rss_mb(), 1),
+        "phase_seconds": {phase: round(seconds, 3) for phase, seconds in phase_times.items()},
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark DataIngestion on synthetic shipments")
+    parser.add_argument("--rows", type=int, nargs="+", default=DEFAULT_SCALES)
+    parser.add_argument("--mongo-url", default=None, help="local mongod to use instead of mongomock")
+    parser.add_argument("--null-fraction", type=float, default=0.05)
+    parser.add_argument("--single", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    # Child process, running exactly one scale
+    if args.single:
+        print(json.dumps(run_scale(args.rows[0], args.mongo_url, args.null_fraction)))
+        return
+
+    for n_rows in args.rows:
+        command = [
+            sys.executable, "-m", "benchmarks.ingestion_benchmark", "--single",
+            "--rows", str(n_rows), "--null-fraction", str(args.null_fraction),
+        ]
+        if args.mongo_url is not None:
+            command += ["--mongo-url", args.mongo_url]
+        output = subprocess.run(command, check=True, capture_output=True, text=True).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        phases = ", ".join(f"{phase}={seconds}s" for phase, seconds in result["phase_seconds"].items())
+        print(
+            f"{result['rows']:>10} rows: {result['rows_per_sec']:>12} rows/sec, "
+            f"peak RSS {result['peak_rss_mb']} MB, {phases}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+from typing import Iterator
+import numpy as np
+import pandas as pd
+from pandas import DataFrame
+from shipping_price.constant import SCHEMA_CONFIG_FILE
+from shipping_price.utils.main_utils import MainUtils
+
+MATERIALS = ["Brass", "Clay", "Aluminium", "Wood", "Marble", "Bronze", "Stone"]
+TRANSPORTS = ["Airways", "Roadways", "Waterways"]
+CUSTOMER_INFORMATION = ["Working Class", "Wealthy"]
+YES_NO = ["Yes", "No"]
+STATES = ["OH", "WY", "CA", "NY", "TX", "FL", "WA", "IL"]
+
+# Columns which are sometimes missing in the real extract
+NULLABLE_COLUMNS = [
+    "Artist Reputation",
+    "Height",
+    "Width",
+    "Weight",
+    "Material",
+    "Transport",
+    "Remote Location",
+]
+
+
+def generate_shipments(
+    n_rows: int, seed: int = 0, null_fraction: float = 0.05, start: int = 0
+) -> DataFrame:
+    """
+    Method Name: generate_shipments
+
+    Description: This method generates synthetic shipment documents with the columns and dtypes of
+                 configs/schema.yaml and value ranges close to the real extract.
+
+    Output: DataFrame of n_rows shipments
+    """
+    rng = np.random.default_rng(seed)
+    row_ids = np.arange(start, start + n_rows)
+
+    height = rng.integers(3, 74, n_rows).astype(np.float64)
+    width = rng.integers(2, 51, n_rows).astype(np.float64)
+    weight = np.round(rng.lognormal(7, 2.5, n_rows))
+    price = np.round(rng.lognormal(3.5, 2, n_rows), 2)
+    base_price = np.round(rng.uniform(10, 100, n_rows), 2)
+    scheduled = pd.Timestamp("2015-01-01") + pd.to_timedelta(rng.integers(0, 1500, n_rows), unit="D")
+    delivered = scheduled + pd.to_timedelta(rng.integers(-5, 10, n_rows), unit="D")
+
+    df = pd.DataFrame(
+        {
+            "Customer Id": [f"{i:020x}" for i in row_ids],
+            "Artist Name": [f"Artist {i % 5000}" for i in row_ids],
+            "Artist Reputation": np.round(rng.uniform(0, 1, n_rows), 2),
+            "Height": height,
+            "Width": width,
+            "Weight": weight,
+            "Material": rng.choice(MATERIALS, n_rows),
+            "Price Of Sculpture": price,
+            "Base Shipping Price": base_price,
+            "International": rng.choice(YES_NO, n_rows),
+            "Express Shipment": rng.choice(YES_NO, n_rows),
+            "Installation Included": rng.choice(YES_NO, n_rows),
+            "Transport": rng.choice(TRANSPORTS, n_rows),
+            "Fragile": rng.choice(YES_NO, n_rows),
+            "Customer Information": rng.choice(CUSTOMER_INFORMATION, n_rows),
+            "Remote Location": rng.choice(YES_NO, n_rows),
+            "Scheduled Date": scheduled.strftime("%m/%d/%y"),
+            "Delivery Date": delivered.strftime("%m/%d/%y"),
+            "Customer Location": [f"City {i % 997}, {STATES[i % len(STATES)]} {10000 + i % 89999}" for i in row_ids],
+            "Cost": np.round(base_price + price * 0.5 + weight * 0.01 + rng.normal(0, 50, n_rows), 2),
+        }
+    )
+
+    # Knocking out values the way the real extract has them missing
+    for col in NULLABLE_COLUMNS:
+        df.loc[rng.random(n_rows) < null_fraction, col] = None
+
+    # Keeping the column order and dtypes of the schema file
+    schema_config = MainUtils().read_yaml_file(filename=SCHEMA_CONFIG_FILE)
+    schema_cols = [list(column.keys())[0] for column in schema_config["columns"]]
+    return df[schema_cols]
+
+
+def iter_shipment_chunks(
+    n_rows: int, chunk_size: int = 100000, seed: int = 0, null_fraction: float = 0.05
+) -> Iterator[DataFrame]:
+    """
+    Method Name: iter_shipment_chunks
+
+    Description: This method generates n_rows synthetic shipments in chunks so that large scales never
+                 have to be held in memory at once.
+
+    Output: Iterator of DataFrame chunks
+    """
+    for chunk_idx, start in enumerate(range(0, n_rows, chunk_size)):
+        yield generate_shipments(
+            min(chunk_size, n_rows - start),
+            seed=seed + chunk_idx,
+            null_fraction=null_fraction,
+            start=start,
+        )
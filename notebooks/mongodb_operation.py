@@ -1,22 +1,14 @@
-from pymongo import MongoClient
 import pandas as pd
-from json import loads
-from dotenv import load_dotenv
-import os
-
-load_dotenv()
+from shipping_price.configuration.mongo_operations import MongoDBOperation
+from shipping_price.constant import DB_NAME, COLLECTION_NAME
 
 data_frame = pd.read_csv(r"C:\Harshal\Data-Science-Projects\shipping-price-prediction\notebooks\data\train.csv")
 
-records = list(loads(data_frame.T.to_json()).values())
-
-client = MongoClient(os.getenv("MONGODB_URL"))
-
-database_name = client["iNeuron"]
-
-collection = database_name["shipping_price"]
+mongo_op = MongoDBOperation()
 
-collection.insert_many(records)
+rows_per_sec = mongo_op.insert_dataframe_as_record(data_frame, DB_NAME, COLLECTION_NAME)
+print(f"Inserted {len(data_frame)} records at {rows_per_sec:.0f} rows/sec")
 
+collection = mongo_op.get_collection(mongo_op.get_database(DB_NAME), COLLECTION_NAME)
 for i in collection.find():
     print(i)
\ No newline at end of file
@@ -1,14 +1,24 @@
+import json
 import os
 import sys
+from datetime import datetime
+import numpy as np
+import pandas as pd
 from pandas import DataFrame
 from shipping_price.exception import ShippingException
 from shipping_price.logger import logging
-from typing import Tuple
-from sklearn.model_selection import train_test_split
+from typing import Dict, List, Optional, Tuple
 from shipping_price.configuration.mongo_operations import MongoDBOperation
 from shipping_price.entity.config_entity import DataIngestionConfig
 from shipping_price.entity.artifacts_entity import DataIngestionArtifacts
-from shipping_price.constant import TEST_SIZE
+from shipping_price.utils.column_statistics import compute_train_test_statistics, save_column_statistics
+from shipping_price.constant import (
+    CATEGORY_MAX_CARDINALITY,
+    DATA_INGESTION_WATERMARK_METADATA_KEY,
+    RANDOM_STATE,
+    SPLIT_HASH_BUCKETS,
+    TEST_SIZE,
+)
 
 class DataIngestion:
     def __init__(self,
@@ -17,6 +27,220 @@ class DataIngestion:
         self.mongo_op = mongo_op
         
         
+    def get_aggregation_pipeline(self, watermark: Optional[object] = None) -> List[Dict]:
+        """
+        Method Name: get_aggregation_pipeline
+        
+        Description: This method builds the MongoDB aggregation pipeline from schema file. The $match stage
+                     discards documents with a null, missing or NaN value in any kept column and the $project
+                     stage keeps only the schema columns which are not in drop_columns. The helper columns
+                     (watermark field and split key) are projected as well and, when a watermark is given,
+                     only documents newer than the watermark are matched.
+        
+        Output: List of aggregation pipeline stages
+        """
+        logging.info("Entered get_aggregation_pipeline method of Data Ingestion class")
+        try:
+            keep_cols = self.data_ingestion_config.KEEP_COLS
+            schema_dtypes = self.data_ingestion_config.SCHEMA_DTYPES
+            watermark_field = self.data_ingestion_config.WATERMARK_FIELD
+            
+            # Filtering on the watermark first so that MongoDB can use the index on it
+            match_filter = {}
+            if watermark is not None:
+                match_filter[watermark_field] = {"$gt": watermark}
+            
+            # Equivalent of dropna() on the kept columns, NaN never satisfies $gte so it is dropped as well
+            for col in keep_cols:
+                match_filter[col] = (
+                    {"$type": "string"}
+                    if schema_dtypes[col] == "object"
+                    else {"$type": "number", "$gte": float("-inf")}
+                )
+            match_stage = {"$match": match_filter}
+            
+            # Equivalent of dropping DROP_COLS and the _id column
+            projection = {"_id": 0, **{col: 1 for col in keep_cols}}
+            for col in self.get_helper_columns():
+                projection[col] = 1
+            project_stage = {"$project": projection}
+            
+            logging.info("Exited get_aggregation_pipeline method of Data Ingestion class")
+            return [match_stage, project_stage]
+        
+        except Exception as e:
+            raise ShippingException(e, sys) from e
+        
+        
+    def get_helper_columns(self) -> List[str]:
+        """
+        Method Name: get_helper_columns
+        
+        Description: This method lists the fields which are fetched only for ingestion itself, the watermark
+                     field in incremental mode and the split key in hash split mode.
+        
+        Output: List of helper column names
+        """
+        try:
+            helper_cols = []
+            if self.data_ingestion_config.INCREMENTAL_INGESTION:
+                helper_cols.append(self.data_ingestion_config.WATERMARK_FIELD)
+            if self.data_ingestion_config.SPLIT_MODE == "hash" and self.data_ingestion_config.SPLIT_KEY is not None:
+                helper_cols.append(self.data_ingestion_config.SPLIT_KEY)
+            return [
+                col for col in dict.fromkeys(helper_cols)
+                if col not in self.data_ingestion_config.KEEP_COLS
+            ]
+        
+        except Exception as e:
+            raise ShippingException(e, sys) from e
+        
+        
+    def read_snapshot(self) -> Tuple[Optional[DataFrame], Optional[object]]:
+        """
+        Method Name: read_snapshot
+        
+        Description: This method reads the local columnar snapshot of previously ingested documents and
+                     the watermark of the newest document in it, stored in the parquet key-value metadata.
+        
+        Output: Snapshot DataFrame and watermark, both None if there is no snapshot yet
+        """
+        logging.info("Entered read_snapshot method of Data Ingestion class")
+        try:
+            import pyarrow.parquet as pq
+
+            if not os.path.exists(self.data_ingestion_config.SNAPSHOT_FILE_PATH):
+                logging.info("No ingestion snapshot found, doing a full load")
+                return None, None
+            
+            metadata = pq.read_schema(self.data_ingestion_config.SNAPSHOT_FILE_PATH).metadata or {}
+            if DATA_INGESTION_WATERMARK_METADATA_KEY.encode() not in metadata:
+                logging.info("Snapshot has no watermark, doing a full load")
+                return None, None
+            watermark_info = json.loads(metadata[DATA_INGESTION_WATERMARK_METADATA_KEY.encode()])
+            
+            # Snapshot taken for another watermark field can not be continued
+            if watermark_info["field"] != self.data_ingestion_config.WATERMARK_FIELD:
+                logging.info("Watermark field changed since last snapshot, doing a full load")
+                return None, None
+            
+            # Converting the stored watermark back to the type MongoDB compares against
+            if watermark_info["type"] == "objectid":
+                from bson import ObjectId
+
+                watermark = ObjectId(watermark_info["value"])
+            elif watermark_info["type"] == "datetime":
+                watermark = datetime.fromisoformat(watermark_info["value"])
+            else:
+                watermark = watermark_info["value"]
+            
+            snapshot = pd.read_parquet(self.data_ingestion_config.SNAPSHOT_FILE_PATH)
+            logging.info(f"Read snapshot of {len(snapshot)} rows with watermark {watermark}")
+            logging.info("Exited read_snapshot method of Data Ingestion class")
+            return snapshot, watermark
+        
+        except Exception as e:
+            raise ShippingException(e, sys) from e
+        
+        
+    def write_snapshot(self, df: DataFrame) -> None:
+        """
+        Method Name: write_snapshot
+        
+        Description: This method writes the merged dataframe as the local columnar snapshot and
+                     records the newest value of the watermark field as the watermark in the parquet
+                     key-value metadata, so that one rename publishes the snapshot and its watermark together.
+        
+        Output: None
+        """
+        logging.info("Entered write_snapshot method of Data Ingestion class")
+        try:
+            watermark_field = self.data_ingestion_config.WATERMARK_FIELD
+            if len(df) == 0:
+                logging.info("Nothing ingested yet, not writing a snapshot")
+                return None
+            
+            os.makedirs(self.data_ingestion_config.SNAPSHOT_DIR, exist_ok=True)
+            
+            # _id is kept as hex string which sorts in the same order as the ObjectId itself
+            watermark = df[watermark_field].max()
+            if watermark_field == "_id":
+                watermark_info = {"field": watermark_field, "type": "objectid", "value": str(watermark)}
+            elif isinstance(watermark, datetime):
+                watermark_info = {"field": watermark_field, "type": "datetime", "value": watermark.isoformat()}
+            else:
+                watermark_info = {
+                    "field": watermark_field,
+                    "type": "value",
+                    "value": watermark.item() if hasattr(watermark, "item") else watermark,
+                }
+            
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            # Writing to a temporary file first so a failed run never leaves a half written snapshot or a
+            # snapshot with the watermark of another one
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            table = table.replace_schema_metadata(
+                {
+                    **(table.schema.metadata or {}),
+                    DATA_INGESTION_WATERMARK_METADATA_KEY.encode(): json.dumps(watermark_info).encode(),
+                }
+            )
+            snapshot_tmp_path = self.data_ingestion_config.SNAPSHOT_FILE_PATH + ".tmp"
+            pq.write_table(table, snapshot_tmp_path)
+            os.replace(snapshot_tmp_path, self.data_ingestion_config.SNAPSHOT_FILE_PATH)
+            
+            logging.info(f"Saved snapshot of {len(df)} rows with watermark {watermark_info['value']}")
+            logging.info("Exited write_snapshot method of Data Ingestion class")
+        
+        except Exception as e:
+            raise ShippingException(e, sys) from e
+        
+        
+    def get_data_from_mongodb_incremental(self) -> DataFrame:
+        """
+        Method Name: get_data_from_mongodb_incremental
+        
+        Description: This method fetches only the documents newer than the snapshot watermark from
+                     MongoDB database, merges them into the local snapshot and saves the new snapshot.
+        
+        Output: DataFrame
+        """
+        logging.info("Entered get_data_from_mongodb_incremental method of Data Ingestion class")
+        try:
+            snapshot, watermark = self.read_snapshot()
+            
+            # getting only the new documents from MongoDB database
+            delta = self.mongo_op.get_collection_as_dataframe(
+                self.data_ingestion_config.DB_NAME,
+                self.data_ingestion_config.COLLECTION_NAME,
+                dtypes=self.data_ingestion_config.SCHEMA_DTYPES,
+                pipeline=self.get_aggregation_pipeline(watermark=watermark),
+                keep_id="_id" in self.get_helper_columns(),
+                n_partitions=self.data_ingestion_config.READ_PARTITIONS,
+                partition_key=self.data_ingestion_config.PARTITION_KEY,
+            )
+            logging.info(f"Got {len(delta)} new documents from MongoDB")
+            
+            # Merging the new documents into the snapshot
+            if snapshot is None:
+                df = delta
+            elif len(delta) == 0:
+                df = snapshot
+            else:
+                df = pd.concat([snapshot, delta], ignore_index=True)
+            
+            if len(delta) > 0:
+                self.write_snapshot(df)
+            
+            logging.info("Exited get_data_from_mongodb_incremental method of Data Ingestion class")
+            return df
+        
+        except Exception as e:
+            raise ShippingException(e, sys) from e
+        
+        
     def get_data_from_mongodb(self) -> DataFrame:
         """
         Method Name: get_data_from_mongodb
@@ -29,10 +253,15 @@ class DataIngestion:
         try:
             logging.info("Getting the dataframe from mongodb")
             
-            # getting collection from MongoDB database
+            # getting collection from MongoDB database, dropping columns and null rows server side
             df = self.mongo_op.get_collection_as_dataframe(
                 self.data_ingestion_config.DB_NAME,
                 self.data_ingestion_config.COLLECTION_NAME,
+                dtypes=self.data_ingestion_config.SCHEMA_DTYPES,
+                pipeline=self.get_aggregation_pipeline(),
+                keep_id="_id" in self.get_helper_columns(),
+                n_partitions=self.data_ingestion_config.READ_PARTITIONS,
+                partition_key=self.data_ingestion_config.PARTITION_KEY,
             )
             
             logging.info("Got the dataframe from MongoDB")
@@ -43,12 +272,110 @@ class DataIngestion:
             raise ShippingException(e, sys) from e
         
         
+    def apply_memory_plan(self, df: DataFrame) -> DataFrame:
+        """
+        Method Name: apply_memory_plan
+        
+        Description: This method compacts the dataframe dtypes based on schema file. Categorical columns with
+                     low cardinality become pandas category and numerical columns are downcast to float32
+                     only when every value survives the round trip to float32 exactly. Lossy downcasts are
+                     opt-in, a column listed under float32_tolerance in schema file is downcast when no value
+                     moves by more than its absolute tolerance. The target is left as is.
+        
+        Output: DataFrame with compacted dtypes
+        """
+        logging.info("Entered apply_memory_plan method of Data Ingestion class")
+        try:
+            schema_config = self.data_ingestion_config.SCHEMA_CONFIG
+            bytes_before = df.memory_usage(deep=True).sum()
+            memory_plan = {}
+            
+            # Low cardinality categorical columns are stored as integer codes with a small lookup table
+            for col in schema_config["categorical_columns"]:
+                if col in df.columns and df[col].nunique() <= CATEGORY_MAX_CARDINALITY:
+                    memory_plan[col] = "category"
+            
+            # Downcasting numerical columns only where float32 keeps the values, or within the declared tolerance
+            float32_tolerance = schema_config.get("float32_tolerance") or {}
+            for col in schema_config["numerical_columns"]:
+                if col in df.columns and df[col].dtype == np.float64:
+                    values = df[col].to_numpy()
+                    round_trip = values.astype(np.float32).astype(np.float64)
+                    if col in float32_tolerance:
+                        keeps_values = np.allclose(
+                            round_trip, values, rtol=0, atol=float32_tolerance[col], equal_nan=True
+                        )
+                    else:
+                        keeps_values = np.array_equal(round_trip, values, equal_nan=True)
+                    if keeps_values:
+                        memory_plan[col] = np.float32
+            
+            df = df.astype(memory_plan)
+            bytes_after = df.memory_usage(deep=True).sum()
+            logging.info(
+                f"Applied memory plan {memory_plan}, dataframe size reduced from {bytes_before} bytes to {bytes_after} bytes"
+            )
+            logging.info("Exited apply_memory_plan method of Data Ingestion class")
+            return df
+        
+        except Exception as e:
+            raise ShippingException(e, sys) from e
+        
+        
+    def get_test_mask(self, chunk: DataFrame) -> np.ndarray:
+        """
+        Method Name: get_test_mask
+        
+        Description: This method assigns every row of the chunk to train or test set by hashing its split key,
+                     or all the kept columns when there is no split key. A row depends only on its own key,
+                     so the assignment is the same for any chunking of the data and across runs.
+        
+        Output: Boolean array, True for the rows of the test set
+        """
+        try:
+            split_key = self.data_ingestion_config.SPLIT_KEY
+            key_cols = (
+                [split_key]
+                if split_key is not None and split_key in chunk.columns
+                else [col for col in self.data_ingestion_config.KEEP_COLS if col in chunk.columns]
+            )
+            
+            # hash_pandas_object uses a fixed hash key, so the hashes are stable between processes
+            hashes = pd.util.hash_pandas_object(chunk[key_cols], index=False).to_numpy()
+            buckets = hashes % np.uint64(SPLIT_HASH_BUCKETS)
+            return buckets < np.uint64(round(TEST_SIZE * SPLIT_HASH_BUCKETS))
+        
+        except Exception as e:
+            raise ShippingException(e, sys) from e
+        
+        
+    def split_chunk(self, chunk: DataFrame) -> Tuple[DataFrame, DataFrame]:
+        """
+        Method Name: split_chunk
+        
+        Description: This method splits a chunk of data into its train part and test part with the hash split,
+                     dropping the helper columns.
+        
+        Output: Train DataFrame and Test DataFrame of the chunk
+        """
+        try:
+            test_mask = self.get_test_mask(chunk)
+            helper_cols = [col for col in self.get_helper_columns() if col in chunk.columns]
+            chunk = chunk.drop(columns=helper_cols)
+            return chunk[~test_mask], chunk[test_mask]
+        
+        except Exception as e:
+            raise ShippingException(e, sys) from e
+        
+        
     # This method will split the data
     def split_data_as_train_test(self, df: DataFrame) -> Tuple[DataFrame, DataFrame]:
         """
         Method Name: split_data_as_train_test
         
         Description: This method splits the dataframe into train set and test set based on split ratio.
+                     In hash split mode every row goes to the same set on every run, otherwise a seeded
+                     random split is used.
         
         Output: Train DataFrame and Test DataFrame
         """
@@ -61,8 +388,18 @@ class DataIngestion:
             )
             
             # Splitting the data into train and test set
-            train_set, test_set = train_test_split(df, test_size=TEST_SIZE)
-            logging.info("Performed train test split on the dataframe")
+            if self.data_ingestion_config.SPLIT_MODE == "hash":
+                train_set, test_set = self.split_chunk(df)
+            else:
+                from sklearn.model_selection import train_test_split
+
+                helper_cols = [col for col in self.get_helper_columns() if col in df.columns]
+                train_set, test_set = train_test_split(
+                    df.drop(columns=helper_cols), test_size=TEST_SIZE, random_state=RANDOM_STATE
+                )
+            logging.info(
+                f"Performed {self.data_ingestion_config.SPLIT_MODE} train test split on the dataframe"
+            )
             
             # Creating train directory under data ingestion artifacts directory
             os.makedirs(
@@ -80,21 +417,17 @@ class DataIngestion:
                 f"Created {os.path.basename(self.data_ingestion_config.TEST_DATA_ARTIFACTS_FILE_DIR)} directory"
             )
             
-            # Saving train.csv file to train directory
-            train_set.to_csv(
-                self.data_ingestion_config.TRAIN_DATA_FILE_PATH,
-                index=False,
-                header=True,
+            # Saving train file to train directory, dtypes of the memory plan are kept in the file
+            self.data_ingestion_config.UTILS.save_dataframe(
+                train_set, self.data_ingestion_config.TRAIN_DATA_FILE_PATH
             )
             
-            # Saving test.csv file to test directory
-            test_set.to_csv(
-                self.data_ingestion_config.TEST_DATA_FILE_PATH,
-                index=False,
-                header=True,
+            # Saving test file to test directory, dtypes of the memory plan are kept in the file
+            self.data_ingestion_config.UTILS.save_dataframe(
+                test_set, self.data_ingestion_config.TEST_DATA_FILE_PATH
             )
             
-            logging.info("Converted Train DataFrame and Test DataFrame into csv format")
+            logging.info("Converted Train DataFrame and Test DataFrame into parquet format")
             logging.info(
                 f"Saved {os.path.basename(self.data_ingestion_config.TRAIN_DATA_FILE_PATH)},\
                   {os.path.basename(self.data_ingestion_config.TEST_DATA_FILE_PATH)} in\
@@ -108,6 +441,30 @@ class DataIngestion:
         except Exception as e:
             raise ShippingException(e, sys) from e
         
+    # This method saves the column statistics of the train set and the test set
+    def save_column_statistics(self, train_set: DataFrame, test_set: DataFrame) -> str:
+        """
+        Method Name: save_column_statistics
+        
+        Description: This method computes cardinality, quantiles, min and max, null counts and category
+                     frequencies of every column of the train set and the test set in one concurrent scan
+                     each and saves them as an artifact, which validation and transformation read instead of
+                     rescanning the data
+        
+        Output: Column statistics file path
+        """
+        logging.info("Entered save_column_statistics method of Data Ingestion class")
+        try:
+            statistics = compute_train_test_statistics(train_set, test_set)
+            file_path = save_column_statistics(
+                statistics, self.data_ingestion_config.COLUMN_STATISTICS_FILE_PATH
+            )
+            logging.info(f"Saved column statistics to {os.path.basename(file_path)}")
+            logging.info("Exited save_column_statistics method of Data Ingestion class")
+            return file_path
+        except Exception as e:
+            raise ShippingException(e, sys) from e
+        
     # This method initiates data ingestion
     def initiate_data_ingestion(self) -> DataIngestionArtifacts:
         """
@@ -119,22 +476,28 @@ class DataIngestion:
         """
         logging.info("Entered initiate_data_ingestion method of Data Ingestion class") 
         try:
-            # Getting data from mongodb
-            df  = self.get_data_from_mongodb()
-            
-            # Dropping the unnecessary columns from dataframe
-            df1 = df.drop(self.data_ingestion_config.DROP_COLS, axis=1)
-            df1 = df1.dropna()
+            # Getting data from mongodb, unnecessary columns and null rows are already dropped by MongoDB
+            if self.data_ingestion_config.INCREMENTAL_INGESTION:
+                df = self.get_data_from_mongodb_incremental()
+            else:
+                df = self.get_data_from_mongodb()
             logging.info("Got the data from mongodb")
             
+            # Compacting dtypes so that every later stage works on the smaller frames
+            df = self.apply_memory_plan(df)
+            
             # Splitting the data into train and test set
-            self.split_data_as_train_test(df1)
+            train_set, test_set = self.split_data_as_train_test(df)
+            
+            # Computing the column statistics once for every later stage
+            self.save_column_statistics(train_set, test_set)
             logging.info("Exited initiate_data_ingestion method of Data Ingestion class")
             
             # Saving data ingestion artifacts
             data_ingestion_artifact = DataIngestionArtifacts(
                 train_data_file_path=self.data_ingestion_config.TRAIN_DATA_FILE_PATH,
                 test_data_file_path=self.data_ingestion_config.TEST_DATA_FILE_PATH,
+                column_statistics_file_path=self.data_ingestion_config.COLUMN_STATISTICS_FILE_PATH,
             )
             
             return data_ingestion_artifact
@@ -3,16 +3,20 @@ import sys
 from pandas import DataFrame
 import numpy as np
 import pandas as pd
-from category_encoders.binary import BinaryEncoder
-from sklearn.compose import ColumnTransformer
-from sklearn.preprocessing import OneHotEncoder, StandardScaler
+from scipy import sparse
+from typing import Dict, Iterator, List, Tuple
 from shipping_price.logger import logging
 from shipping_price.exception import ShippingException
+from shipping_price.constant import TRANSFORMED_DTYPE
 from shipping_price.entity.config_entity import DataTransformationConfig
 from shipping_price.entity.artifacts_entity import (
     DataIngestionArtifacts,
     DataTransformationArtifacts,
 )
+from shipping_price.utils.array_writer import CsrAppendWriter, NpyAppendWriter
+from shipping_price.utils.column_statistics import load_column_statistics
+from shipping_price.utils.artifact_cache import ArtifactCache
+from shipping_price.utils.sampling_utils import QuantileSketch
 
 
 class DataTransformation:
@@ -25,9 +29,12 @@ class DataTransformation:
         self.data_transformation_config = data_transformation_config
         
         
-        # Reading train.csv and test.csv from data ingestion artifacts
-        self.train_set = pd.read_csv(self.data_ingestion_artifacts.train_data_file_path)
-        self.test_set = pd.read_csv(self.data_ingestion_artifacts.test_data_file_path)
+        # Column statistics computed once at ingestion, used instead of rescanning the train set
+        column_statistics = load_column_statistics(self.data_ingestion_artifacts.column_statistics_file_path)
+        self.column_statistics = column_statistics["train"]["columns"] if column_statistics is not None else None
+        self.cache = ArtifactCache(
+            self.data_transformation_config.CACHE_DIR, self.data_transformation_config.CACHE_MAX_BYTES
+        )
         
     # This method is used to get the transformer object
     def get_data_transformer_object(self) -> object:
@@ -57,19 +64,31 @@ class DataTransformation:
                 "Got numerical cols, onehot cols, binary cols from schema config"
             )
             
-            # Creating transformer object
-            numeric_transformer = StandardScaler()
+            from category_encoders.binary import BinaryEncoder
+            from sklearn.compose import ColumnTransformer
+            from sklearn.pipeline import Pipeline
+            from sklearn.preprocessing import OneHotEncoder, StandardScaler
+            from shipping_price.utils.preprocessing import OutlierCapper
+
+            # Creating transformer object, outliers are capped with the train set bounds before scaling
+            numeric_transformer = Pipeline(
+                [
+                    ("outliercapper", OutlierCapper()),
+                    ("standardscaler", StandardScaler()),
+                ]
+            )
             oh_transformer = OneHotEncoder(handle_unknown="ignore")
             binary_transformer = BinaryEncoder()
-            logging.info("Initialized StandardScaler, OneHotEncoder and BinaryEncoder")
+            logging.info("Initialized OutlierCapper, StandardScaler, OneHotEncoder and BinaryEncoder")
             
-            # Using transformer object in column transformer
+            # Using transformer object in column transformer, the sparse one-hot output is kept sparse
             preprocessor = ColumnTransformer(
                 [
                     ("onehotencoder", oh_transformer, onehot_columns),
                     ("binaryencoder", binary_transformer, binary_columns),
-                    ("standardscaler", numeric_transformer, numerical_columns),
-                ]
+                    ("numerical", numeric_transformer, numerical_columns),
+                ],
+                sparse_threshold=1.0,
             )
             
             logging.info("Created preprocessor object from ColumnTransformer")
@@ -81,95 +100,35 @@ class DataTransformation:
         except Exception as e:
             raise ShippingException(e, sys) from e
         
-    # This static method for capping the outliers
-    @staticmethod
-    def _outlier_capping(col, df: DataFrame) -> DataFrame:
-        """
-        Method Name: _outlier_capping
-        
-        Description: This method performs outlier capping in the dataframe
-        
-        Output: DataFrame.
-        """
-        logging.info("Entered _outlier_capping method of Data_Transformation class")
-        try:
-            logging.info("Performing _outlier_capping for columns in the dataframe")
-            percentile25 = df[col].quantile(0.25) # calculating 25 percentile
-            percentile75 = df[col].quantile(0.75) # calculating 75 percentile
-            
-            # Calculating upper limit and lower limit
-            iqr = percentile75 - percentile25
-            upper_limit = percentile75 + 1.5 * iqr
-            lower_limit = percentile25 - 1.5 * iqr
-            
-            # Capping the outliers
-            df.loc[(df[col] > upper_limit), col] = upper_limit
-            df.loc[(df[col] < lower_limit), col] = lower_limit
-            
-            logging.info(
-                "Performed _outlier_capping method of Data_Transformation class"
-            )
-            
-            logging.info("Exited _outlier_capping method of Data_Transformation class")
-            return df
-        except Exception as e:
-            raise ShippingException(e, sys) from e
-        
-    # This method is used to initialize data transformation
-    def initiate_data_transformation(self) -> DataTransformationArtifacts:
+    # This method is used to fit the preprocessor and transform the sets held in memory
+    def transform_in_memory(self, preprocessor: object) -> Tuple[str, str, str, str]:
         """
-        Method Name: initiate_data_transformation
+        Method Name: transform_in_memory
         
-        Description: This method initiates data transformation
+        Description: This method fits the preprocessor on the train set and saves the transformed train and
+                     test sets, both sets are held in memory
         
-        Output: Data transformation artifacts
+        Output: Train features, train target, test features and test target file paths
         """
-        logging.info(
-            "Entered initiate_data_transformation method of Data_Transformation class"
-        )
+        logging.info("Entered transform_in_memory method of Data_Transformation class")
         try:
-            # Creating directory for data transformation artifacts
-            os.makedirs(
-                self.data_transformation_config.DATA_TRANSFORMATION_ARTIFACTS_DIR, 
-                exist_ok=True,
+            # Reading only the columns used by the preprocessor from data ingestion artifacts
+            self.train_set = self.data_transformation_config.UTILS.load_dataframe(
+                self.data_ingestion_artifacts.train_data_file_path,
+                columns=self.data_transformation_config.MODEL_COLUMNS,
+                memory_map=True,
             )
-            logging.info(
-                f"Created artifacts directory for {os.path.basename(self.data_transformation_config.DATA_TRANSFORMATION_ARTIFACTS_DIR)}"
+            self.test_set = self.data_transformation_config.UTILS.load_dataframe(
+                self.data_ingestion_artifacts.test_data_file_path,
+                columns=self.data_transformation_config.MODEL_COLUMNS,
+                memory_map=True,
             )
-            # Getting preprocessor object
-            preprocessor = self.get_data_transformer_object()
-            logging.info("Got the preprocessor object")
             
             # Getting target column name from schema file
             target_column_name = self.data_transformation_config.SCHEMA_CONFIG[
                 "target_column"
             ]
             
-            # Getting numerical columns from schema file
-            numerical_columns = self.data_transformation_config.SCHEMA_CONFIG[
-                "numerical_columns"
-            ]
-            
-            logging.info(
-                "Got target column name and numerical columns from schema file"
-            )
-            
-            # outlier capping
-            continuous_columns = [
-                feature 
-                for feature in numerical_columns
-                if len(self.train_set[feature].unique()) >= 25
-            ]
-            
-            logging.info("Got a list of continuous columns")
-            [self._outlier_capping(col, self.train_set) for col in continuous_columns]
-            
-            logging.info("Outlier capping in train set")
-            
-            [self._outlier_capping(col, self.test_set) for col in continuous_columns]
-            
-            logging.info("Outlier capping in test set")
-            
             # Getting input features and target feature of Training dataset
             input_feature_train_df = self.train_set.drop(
                 columns=[target_column_name], axis=1
@@ -184,54 +143,389 @@ class DataTransformation:
             target_feature_test_df = self.test_set[target_column_name]
             logging.info("Got test feature and target feature")
             
-            # Applying preprocessing object on training dataframe and testing dataframe
-            input_feature_train_arr = preprocessor.fit_transform(input_feature_train_df)
-            input_feature_test_arr = preprocessor.transform(input_feature_test_df)
+            # Applying preprocessing object on training dataframe and testing dataframe, features stay in CSR form
+            # and are stored as float32
+            input_feature_train_arr = sparse.csr_matrix(
+                preprocessor.fit_transform(input_feature_train_df), dtype=TRANSFORMED_DTYPE
+            )
+            input_feature_test_arr = sparse.csr_matrix(
+                preprocessor.transform(input_feature_test_df), dtype=TRANSFORMED_DTYPE
+            )
             logging.info("Used the preprocessor object to transform the train and test features")
             
-            # Concatenating input feature array and target feature array of Train dataset
-            train_arr = np.c_[
-                input_feature_train_arr, np.array(target_feature_train_df)
-            ]
-            logging.info("Created train array.")
-            
-            # Creating directory for transformed train dataset array and saving the array
+            # Creating directory for transformed train dataset and saving the features and the target
             os.makedirs(
                 self.data_transformation_config.TRANSFORMED_TRAIN_DATA_DIR,
                 exist_ok=True,
             )
-            transformed_train_file = self.data_transformation_config.UTILS.save_numpy_array_data(
-                self.data_transformation_config.TRANSFORMED_TRAIN_FILE_PATH, train_arr
+            transformed_train_file = self.data_transformation_config.UTILS.save_sparse_array_data(
+                self.data_transformation_config.TRANSFORMED_TRAIN_FILE_PATH, input_feature_train_arr
+            )
+            transformed_train_target_file = self.data_transformation_config.UTILS.save_numpy_array_data(
+                self.data_transformation_config.TRANSFORMED_TRAIN_TARGET_FILE_PATH,
+                target_feature_train_df.to_numpy(dtype=TRANSFORMED_DTYPE),
             )
             logging.info(
-                f"Saved train array to {os.path.basename(self.data_transformation_config.DATA_TRANSFORMATION_ARTIFACTS_DIR)}"
+                f"Saved train features and target to {os.path.basename(self.data_transformation_config.DATA_TRANSFORMATION_ARTIFACTS_DIR)}"
             )
             
-            # Concatenating input feature array and target feature array of Test dataset
-            test_arr = np.c_[
-                input_feature_test_arr, np.array(target_feature_test_df)
-            ]
-            logging.info("Created test array.")
-            
-            # Creating directory for transformed train dataset array and saving the array
+            # Creating directory for transformed test dataset and saving the features and the target
             os.makedirs(
                 self.data_transformation_config.TRANSFORMED_TEST_DATA_DIR,
                 exist_ok=True,
             )
-            transformed_test_file = self.data_transformation_config.UTILS.save_numpy_array_data(
-                self.data_transformation_config.TRANSFORMED_TEST_FILE_PATH, test_arr
+            transformed_test_file = self.data_transformation_config.UTILS.save_sparse_array_data(
+                self.data_transformation_config.TRANSFORMED_TEST_FILE_PATH, input_feature_test_arr
+            )
+            transformed_test_target_file = self.data_transformation_config.UTILS.save_numpy_array_data(
+                self.data_transformation_config.TRANSFORMED_TEST_TARGET_FILE_PATH,
+                target_feature_test_df.to_numpy(dtype=TRANSFORMED_DTYPE),
             )
             logging.info(
-                f"Saved test array to {os.path.basename(self.data_transformation_config.DATA_TRANSFORMATION_ARTIFACTS_DIR)}"
+                f"Saved test features and target to {os.path.basename(self.data_transformation_config.DATA_TRANSFORMATION_ARTIFACTS_DIR)}"
             )
             
-            # Saving the preprocessor object to data transformation artifacts directory
-            preprocessor_obj_file = self.data_transformation_config.UTILS.save_object(
-                self.data_transformation_config.PREPROCESSOR_FILE_PATH, preprocessor
+            logging.info("Exited transform_in_memory method of Data_Transformation class")
+            return (
+                transformed_train_file,
+                transformed_train_target_file,
+                transformed_test_file,
+                transformed_test_target_file,
+            )
+        except Exception as e:
+            raise ShippingException(e, sys) from e
+        
+    # This method is used to collect the fit statistics of the preprocessor in one streaming pass
+    def collect_fit_statistics(self) -> Dict:
+        """
+        Method Name: collect_fit_statistics
+        
+        Description: This method collects the one-hot category sets, the binary encoder levels in order of
+                     first appearance, the quartiles and the distinct value count of every numerical column.
+                     They are taken from the column statistics artifact when available, otherwise the train
+                     set is streamed once with a mergeable quantile sketch per numerical column. Columns with
+                     nulls get a null last category, as the encoders fitted in memory do.
+        
+        Output: Fit statistics of the train set
+        """
+        logging.info("Entered collect_fit_statistics method of Data_Transformation class")
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            from shipping_price.utils.preprocessing import OutlierCapper
+
+            schema_config = self.data_transformation_config.SCHEMA_CONFIG
+            numerical_columns = schema_config["numerical_columns"]
+            min_unique = OutlierCapper().min_unique
+
+            # Nulls are a category of their own for the encoders, ordered last and held in the form the
+            # parquet reader returns them, None for string columns and nan for dictionary columns
+            train_schema = pq.read_schema(self.data_ingestion_artifacts.train_data_file_path)
+
+            def with_nulls(values: List, col: str, has_nulls: bool) -> List:
+                if not has_nulls:
+                    return values
+                return values + [pa.nulls(1, train_schema.field(col).type).to_pandas()[0]]
+            
+            if self.column_statistics is not None:
+                logging.info("Took the fit statistics from the column statistics artifact")
+                columns = self.column_statistics
+                return {
+                    "categories": {
+                        col: with_nulls(sorted(columns[col]["frequencies"]), col, columns[col]["null_count"] > 0)
+                        for col in schema_config["onehot_columns"]
+                    },
+                    "levels": {
+                        col: with_nulls(list(columns[col]["levels"]), col, columns[col]["null_count"] > 0)
+                        for col in schema_config["binary_columns"]
+                    },
+                    "quartiles": np.array([columns[col]["quartiles"] for col in numerical_columns]).T,
+                    "n_unique": np.array([columns[col]["n_unique"] for col in numerical_columns]),
+                }
+            
+            categories = {col: set() for col in schema_config["onehot_columns"]}
+            levels = {col: {} for col in schema_config["binary_columns"]}
+            has_nulls = dict.fromkeys(list(categories) + list(levels), False)
+            sketches = {
+                col: QuantileSketch(self.data_transformation_config.OUTLIER_SKETCH_SIZE)
+                for col in numerical_columns
+            }
+            # Distinct values are only tracked up to the count that makes a column continuous
+            distinct = {col: set() for col in numerical_columns}
+            n_rows = 0
+            
+            for chunk in self.iter_train_chunks():
+                for col in categories:
+                    categories[col].update(chunk[col].dropna().astype(str).unique())
+                for col in levels:
+                    for level in chunk[col].dropna().astype(object).unique():
+                        levels[col].setdefault(level, None)
+                for col in has_nulls:
+                    has_nulls[col] = has_nulls[col] or bool(chunk[col].isna().any())
+                for col in numerical_columns:
+                    values = chunk[col].to_numpy(dtype=np.float64)
+                    sketches[col].update(values)
+                    if len(distinct[col]) < min_unique:
+                        distinct[col].update(np.unique(values[~np.isnan(values)])[:min_unique].tolist())
+                n_rows += len(chunk)
+            logging.info(f"Collected fit statistics from {n_rows} train rows")
+            
+            logging.info("Exited collect_fit_statistics method of Data_Transformation class")
+            return {
+                "categories": {
+                    col: with_nulls(sorted(values), col, has_nulls[col]) for col, values in categories.items()
+                },
+                "levels": {col: with_nulls(list(values), col, has_nulls[col]) for col, values in levels.items()},
+                "quartiles": np.array([sketches[col].quantile([0.25, 0.75]) for col in numerical_columns]).T,
+                "n_unique": np.array([len(distinct[col]) for col in numerical_columns]),
+            }
+        except Exception as e:
+            raise ShippingException(e, sys) from e
+        
+    # This method is used to fit the preprocessor out of core
+    def fit_out_of_core(self, preprocessor: object) -> object:
+        """
+        Method Name: fit_out_of_core
+        
+        Description: This method fits the preprocessor without loading the train set. The encoders are fitted
+                     on a small seed frame holding every collected category and level, then the outlier
+                     bounds are set from the quantile sketches and the scaler statistics are accumulated
+                     with partial_fit on the capped chunks of a second streaming pass.
+        
+        Output: Fitted preprocessor object
+        """
+        logging.info("Entered fit_out_of_core method of Data_Transformation class")
+        try:
+            from sklearn.base import clone
+
+            schema_config = self.data_transformation_config.SCHEMA_CONFIG
+            numerical_columns = schema_config["numerical_columns"]
+            statistics = self.collect_fit_statistics()
+            
+            # Seed frame with every category and the binary levels in order of first appearance
+            values = {**statistics["categories"], **statistics["levels"]}
+            n_seed_rows = max([len(col_values) for col_values in values.values()] + [1])
+            seed = pd.DataFrame(
+                {col: [col_values[i % len(col_values)] for i in range(n_seed_rows)] for col, col_values in values.items()}
+            )
+            for col in numerical_columns:
+                seed[col] = np.zeros(n_seed_rows, dtype=TRANSFORMED_DTYPE)
+            preprocessor.fit(seed)
+            logging.info("Fitted the encoders on the seed frame")
+            
+            # Outlier bounds from the sketches
+            numerical_pipeline = preprocessor.named_transformers_["numerical"]
+            outlier_capper = numerical_pipeline.named_steps["outliercapper"]
+            percentile25, percentile75 = statistics["quartiles"]
+            outlier_capper.set_statistics(percentile25, percentile75, statistics["n_unique"])
+            
+            # Scaler statistics of the capped train set, an unfitted copy of the scaler replaces the one fitted
+            # on the seed frame
+            streamed_scaler = clone(numerical_pipeline.named_steps["standardscaler"])
+            for chunk in self.iter_train_chunks(columns=numerical_columns):
+                streamed_scaler.partial_fit(outlier_capper.transform(chunk[numerical_columns]))
+            numerical_pipeline.set_params(standardscaler=streamed_scaler)
+            logging.info("Set outlier bounds and scaler statistics from the streamed train set")
+            
+            logging.info("Exited fit_out_of_core method of Data_Transformation class")
+            return preprocessor
+        except Exception as e:
+            raise ShippingException(e, sys) from e
+        
+    # This method is used to fit the preprocessor and transform the sets chunk by chunk
+    def transform_out_of_core(self, preprocessor: object) -> Tuple[str, str, str, str]:
+        """
+        Method Name: transform_out_of_core
+        
+        Description: This method fits the preprocessor out of core, then streams the train and test sets and
+                     appends every transformed chunk to the output artifacts. Peak memory is bounded by the
+                     chunk size.
+        
+        Output: Train features, train target, test features and test target file paths
+        """
+        logging.info("Entered transform_out_of_core method of Data_Transformation class")
+        try:
+            target_column_name = self.data_transformation_config.SCHEMA_CONFIG["target_column"]
+            self.fit_out_of_core(preprocessor)
+            
+            file_paths = []
+            for data_file_path, features_dir, target_file_path in [
+                (
+                    self.data_ingestion_artifacts.train_data_file_path,
+                    self.data_transformation_config.TRANSFORMED_TRAIN_FILE_PATH,
+                    self.data_transformation_config.TRANSFORMED_TRAIN_TARGET_FILE_PATH,
+                ),
+                (
+                    self.data_ingestion_artifacts.test_data_file_path,
+                    self.data_transformation_config.TRANSFORMED_TEST_FILE_PATH,
+                    self.data_transformation_config.TRANSFORMED_TEST_TARGET_FILE_PATH,
+                ),
+            ]:
+                features_writer = CsrAppendWriter(features_dir, TRANSFORMED_DTYPE)
+                target_writer = NpyAppendWriter(target_file_path, TRANSFORMED_DTYPE)
+                for chunk in self.data_transformation_config.UTILS.iter_dataframe_chunks(
+                    data_file_path,
+                    columns=self.data_transformation_config.MODEL_COLUMNS,
+                    chunk_size=self.data_transformation_config.CHUNK_SIZE,
+                ):
+                    features_writer.append(
+                        sparse.csr_matrix(
+                            preprocessor.transform(chunk.drop(columns=[target_column_name])),
+                            dtype=TRANSFORMED_DTYPE,
+                        )
+                    )
+                    target_writer.append(chunk[target_column_name].to_numpy())
+                file_paths += [features_writer.close(), target_writer.close()]
+                logging.info(f"Saved transformed {os.path.basename(data_file_path)} chunk by chunk")
+            
+            logging.info("Exited transform_out_of_core method of Data_Transformation class")
+            return tuple(file_paths)
+        except Exception as e:
+            raise ShippingException(e, sys) from e
+        
+    def iter_train_chunks(self, columns: List[str] = None) -> Iterator[DataFrame]:
+        return self.data_transformation_config.UTILS.iter_dataframe_chunks(
+            self.data_ingestion_artifacts.train_data_file_path,
+            columns=columns if columns is not None else self.data_transformation_config.MODEL_COLUMNS,
+            chunk_size=self.data_transformation_config.CHUNK_SIZE,
+        )
+        
+    # This method is used to fingerprint the inputs of the data transformation
+    def get_fingerprint(self) -> str:
+        """
+        Method Name: get_fingerprint
+        
+        Description: This method fingerprints everything the transformed artifacts depend on, the content of
+                     the ingestion artifacts, the schema sections read by the preprocessor, the source of the
+                     transformer code with its library versions and the transformation settings
+        
+        Output: Fingerprint of the data transformation inputs
+        """
+        try:
+            import category_encoders
+            import pyarrow
+            import scipy
+            import sklearn
+            from shipping_price.utils import (
+                array_writer,
+                column_statistics,
+                main_utils,
+                preprocessing,
+                sampling_utils,
+            )
+
+            schema_config = self.data_transformation_config.SCHEMA_CONFIG
+            # The quantile sketch and the parquet readers and array loaders shape the artifacts too
+            code_files = [
+                sys.modules[__name__].__file__, preprocessing.__file__, array_writer.__file__,
+                column_statistics.__file__, sampling_utils.__file__, main_utils.__file__,
+            ]
+            config = {
+                "schema": {
+                    key: schema_config[key]
+                    for key in ["numerical_columns", "onehot_columns", "binary_columns", "target_column"]
+                },
+                "code": ArtifactCache.fingerprint(code_files, {}),
+                "versions": [
+                    np.__version__, scipy.__version__, sklearn.__version__, category_encoders.__version__,
+                    pyarrow.__version__,
+                ],
+                "settings": [
+                    TRANSFORMED_DTYPE,
+                    self.data_transformation_config.CHUNKED,
+                    self.data_transformation_config.OUTLIER_SKETCH_SIZE,
+                    # The column statistics are computed from the train set, only whether they are used matters
+                    self.column_statistics is not None,
+                ],
+            }
+            return ArtifactCache.fingerprint(
+                [
+                    self.data_ingestion_artifacts.train_data_file_path,
+                    self.data_ingestion_artifacts.test_data_file_path,
+                ],
+                config,
+            )
+        except Exception as e:
+            raise ShippingException(e, sys) from e
+        
+    # This method is used to initialize data transformation
+    def initiate_data_transformation(self) -> DataTransformationArtifacts:
+        """
+        Method Name: initiate_data_transformation
+        
+        Description: This method initiates data transformation
+        
+        Output: Data transformation artifacts
+        """
+        logging.info(
+            "Entered initiate_data_transformation method of Data_Transformation class"
+        )
+        try:
+            # Creating directory for data transformation artifacts
+            os.makedirs(
+                self.data_transformation_config.DATA_TRANSFORMATION_ARTIFACTS_DIR, 
+                exist_ok=True,
             )
             logging.info(
-                "Saved the preprocessor object in DataTransformation artifacts directory."
+                f"Created artifacts directory for {os.path.basename(self.data_transformation_config.DATA_TRANSFORMATION_ARTIFACTS_DIR)}"
             )
+            
+            # Reusing the artifacts of an earlier run on the same inputs
+            config = self.data_transformation_config
+            artifact_paths = [
+                config.TRANSFORMED_TRAIN_FILE_PATH,
+                config.TRANSFORMED_TRAIN_TARGET_FILE_PATH,
+                config.TRANSFORMED_TEST_FILE_PATH,
+                config.TRANSFORMED_TEST_TARGET_FILE_PATH,
+                config.PREPROCESSOR_FILE_PATH,
+            ]
+            relative_paths = [
+                os.path.relpath(path, config.DATA_TRANSFORMATION_ARTIFACTS_DIR) for path in artifact_paths
+            ]
+            fingerprint = self.get_fingerprint() if config.CACHE else None
+            if fingerprint is not None and self.cache.restore(
+                fingerprint, config.DATA_TRANSFORMATION_ARTIFACTS_DIR
+            ) is not None:
+                logging.info("Reused the cached preprocessor object and transformed arrays")
+                (
+                    transformed_train_file,
+                    transformed_train_target_file,
+                    transformed_test_file,
+                    transformed_test_target_file,
+                    preprocessor_obj_file,
+                ) = artifact_paths
+            else:
+                # Getting preprocessor object
+                preprocessor = self.get_data_transformer_object()
+                logging.info("Got the preprocessor object")
+                
+                # Fitting the preprocessor and saving the transformed train and test sets
+                if self.data_transformation_config.CHUNKED:
+                    (
+                        transformed_train_file,
+                        transformed_train_target_file,
+                        transformed_test_file,
+                        transformed_test_target_file,
+                    ) = self.transform_out_of_core(preprocessor)
+                else:
+                    (
+                        transformed_train_file,
+                        transformed_train_target_file,
+                        transformed_test_file,
+                        transformed_test_target_file,
+                    ) = self.transform_in_memory(preprocessor)
+                
+                # Saving the preprocessor object to data transformation artifacts directory
+                preprocessor_obj_file = self.data_transformation_config.UTILS.save_object(
+                    self.data_transformation_config.PREPROCESSOR_FILE_PATH, preprocessor
+                )
+                logging.info(
+                    "Saved the preprocessor object in DataTransformation artifacts directory."
+                )
+                
+                # Caching the fitted preprocessor and the transformed arrays under the fingerprint
+                if fingerprint is not None:
+                    self.cache.store(fingerprint, config.DATA_TRANSFORMATION_ARTIFACTS_DIR, relative_paths)
             logging.info(
                 "Exited initiate_data_transformation method of Data_Transformation class"
             )
@@ -241,6 +535,8 @@ class DataTransformation:
                 transformed_train_file_path=transformed_train_file,
                 transformed_test_file_path=transformed_test_file,
                 transformed_object_file_path=preprocessor_obj_file,
+                transformed_train_target_file_path=transformed_train_target_file,
+                transformed_test_target_file_path=transformed_test_target_file,
             )
             
             return data_transformation_artifacts
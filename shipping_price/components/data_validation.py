@@ -1,15 +1,13 @@
 import json
 import os
 import sys
-import pandas as pd
 from pandas import DataFrame
-from evidently.model_profile import Profile
-from evidently.model_profile.sections import DataDriftProfileSection
-from typing import Tuple, Union
+from typing import Dict, Tuple, Union
 from shipping_price.exception import ShippingException
 from shipping_price.logger import logging
 from shipping_price.entity.config_entity import DataValidationConfig
 from shipping_price.entity.artifacts_entity import DataIngestionArtifacts, DataValidationArtifacts
+from shipping_price.utils.column_statistics import compute_train_test_statistics, load_column_statistics
 
 class DataValidation:
     def __init__(
@@ -20,193 +18,166 @@ class DataValidation:
         self.data_ingestion_artifacts = data_ingestion_artifacts
         self.data_validation_config = data_validation_config
         
-    # This method is used to validate schema columns
-    def validate_schema_columns(self, df: DataFrame) -> bool:
+    # This method is used to validate the column statistics of a dataset against the schema file
+    def validate_column_statistics(self, statistics: Dict) -> Dict:
         """
-        Method Name: validate_schema_columns
+        Method Name: validate_column_statistics
         
-        Description: This method validates the schema columns of the input DataFrame.
-
-        Output: True if the schema columns are valid, False otherwise.
-        """
-        try:
-            # checking the len of dataframe columns and schema file columns
-            if len(df.columns) == len(
-                self.data_validation_config.SCHEMA_CONFIG["columns"]
-            ):
-                validation_status = True
-            else:
-                validation_status = False
-            return validation_status
-        except Exception as e:
-            raise ShippingException(e, sys) from e 
+        Description: This method validates a dataset against the schema file from its column statistics
+                     artifact, without reading the data. It checks column presence, declared dtypes, null
+                     counts, numerical ranges and unknown category levels.
         
-    def is_numerical_column_exists(self, df: DataFrame) -> bool:
-        """
-        Method Name: is_numerical_column_exists
-
-        Description: This method used to validate whether a numerical column exists in the dataframe or not.
-
-        Output: True if there are numerical columns, False otherwise.
+        Output: Validation report of the dataset with its overall status
         """
         try:
-            validation_status = False
-            
-            # Checking numerical schema columns with data frame numerical columns
-            for column in self.data_validation_config.SCHEMA_CONFIG["numerical_columns"]:
-                if column not in df.columns:
-                    logging.info(f"Numerical column - {column} not found in dataframe")
-                else:
-                    validation_status = True
-                return validation_status
+            schema_config = self.data_validation_config.SCHEMA_CONFIG
+            expected_cols = self.data_validation_config.EXPECTED_COLS
+            schema_dtypes = self.data_validation_config.SCHEMA_DTYPES
+            columns = statistics["columns"]
+            present_cols = [col for col in expected_cols if col in columns]
+            
+            # Column presence
+            missing_cols = [col for col in expected_cols if col not in columns]
+            unexpected_cols = [col for col in columns if col not in expected_cols]
+            
+            # Declared dtypes, compacted category and float32 columns still match their schema dtype
+            dtype_mismatches = {
+                col: columns[col]["dtype"]
+                for col in present_cols
+                if (schema_dtypes[col] == "object") == (columns[col]["column_type"] == "num")
+            }
+            
+            # Null counts
+            null_counts = {
+                col: columns[col]["null_count"] for col in present_cols if columns[col]["null_count"] > 0
+            }
+            
+            # Numerical ranges against the ranges declared in schema file
+            numerical_cols = [
+                col for col in schema_config["numerical_columns"]
+                if col in present_cols and col not in dtype_mismatches
+            ]
+            numerical_ranges = {col: [columns[col]["min"], columns[col]["max"]] for col in numerical_cols}
+            out_of_range = {}
+            for col, (low, high) in schema_config.get("column_ranges", {}).items():
+                if col not in numerical_cols or columns[col]["n"] == 0:
+                    continue
+                minimum, maximum = numerical_ranges[col]
+                if (low is not None and minimum < low) or (high is not None and maximum > high):
+                    out_of_range[col] = numerical_ranges[col]
+            
+            # Unknown category levels against the levels declared in schema file
+            unknown_levels = {}
+            for col, levels in schema_config.get("categorical_levels", {}).items():
+                if col in present_cols and columns[col]["column_type"] == "cat":
+                    unknown = set(columns[col]["frequencies"]) - set(levels)
+                    if len(unknown) > 0:
+                        unknown_levels[col] = sorted(unknown)
+            
+            report = {
+                "n_rows": statistics["n_rows"],
+                "missing_columns": missing_cols,
+                "unexpected_columns": unexpected_cols,
+                "dtype_mismatches": dtype_mismatches,
+                "null_counts": null_counts,
+                "numerical_ranges": numerical_ranges,
+                "out_of_range": out_of_range,
+                "unknown_levels": unknown_levels,
+            }
+            report["status"] = not any(
+                [missing_cols, unexpected_cols, dtype_mismatches, null_counts, out_of_range, unknown_levels]
+            )
+            return report
         except Exception as e:
             raise ShippingException(e, sys) from e
         
-    def is_categorical_column_exists(self, df: DataFrame) -> bool:
+    def validate_dataset_schema(self) -> Tuple[bool, Dict]:
         """
-        Method Name: is_categorical_column_exists
+        Method Name: validate_dataset_schema
 
-        Description: This method used to validate whether a categorical column exists in the dataframe or not.
+        Description: This method validates the train set and the test set from their column statistics and
+                     saves the combined report in artifacts directory.
 
-        Output: True if there are categorical columns, False otherwise.
+        Output: Combined validation status and the combined report
         """
+        logging.info("Entered validate_dataset_schema method of Data_Validation class")
         try:
-            validation_status = False
-            
-            # Checking categorical schema columns with data frame categorical columns
-            for column in self.data_validation_config.SCHEMA_CONFIG["categorical_columns"]:
-                if column not in df.columns:
-                    logging.info(f"Categorical column - {column} not found in dataframe")
-                else:
-                    validation_status = True
-                return validation_status
+            # The scans of both sets run concurrently when the statistics are computed, validating them is a
+            # few lookups per column, so the two reports are built one after the other
+            train_report = self.validate_column_statistics(self.column_statistics["train"])
+            test_report = self.validate_column_statistics(self.column_statistics["test"])
+            
+            validation_report = {
+                "status": train_report["status"] and test_report["status"],
+                "train": train_report,
+                "test": test_report,
+            }
+            with open(self.data_validation_config.SCHEMA_REPORT_FILE_PATH, "w") as report_file:
+                json.dump(validation_report, report_file, indent=2)
+            
+            logging.info(f"Dataset schema validation status is {validation_report['status']}")
+            logging.info("Exited validate_dataset_schema method of Data_Validation class")
+            return validation_report["status"], validation_report
         except Exception as e:
             raise ShippingException(e, sys) from e
         
-    def validate_dataset_schema_columns(self) -> Tuple[bool, bool]:
-        """
-        Method Name: validate_dataset_schema_columns
-
-        Description: This method validates the schema columns for train dataframe and test dataframe.
-
-        Output: A tuple containing two boolean values:
-            - The first value indicates whether the schema columns are valid for the train dataset.
-            - The second value indicates whether the schema columns are valid for the test dataset.
+    def create_reference_profile(self, reference: Union[DataFrame, Dict]) -> Dict:
         """
-        logging.info(
-            "Entered validate_dataset_schema_columns method of Data_Validation class"
-        )
-        try:
-            logging.info("Validating dataset schema columns")
-            
-            # Validating schema columns for Train dataframe
-            train_schema_status = self.validate_schema_columns(self.train_set)
-            logging.info("Validated dataset schema columns on the train set")
-            
-            # Validating schema columns for Test dataframe
-            test_schema_status = self.validate_schema_columns(self.test_set)
-            logging.info("Validated dataset schema columns on the test set")
-            
-            logging.info("Validated dataset schema columns")
-            return train_schema_status, test_schema_status
-        except Exception as e:
-            raise ShippingException(e, sys) from e
+        Method Name: create_reference_profile
         
-    def validate_is_numerical_column_exists(self) -> Tuple[bool, bool]:
-        """
-        Method Name: validate_is_numerical_column_exists
-
-        Description: This method validates whether numerical columns exist in the train and test dataframes.
-
-        Output: A tuple containing two boolean values:
-            - The first value indicates whether numerical columns exist in the train dataframe.
-            - The second value indicates whether numerical columns exist in the test dataframe.
-        """
-        logging.info(
-            "Entered validate_dataset_schema_for_numerical_datatype method of Data_Validation class"
-        )
-        try:
-            logging.info("Validating dataset schema for numerical_datatype")
-            
-            # Validating numerical columns with Train Dataframe
-            train_num_datatype_status = self.is_numerical_column_exists(self.train_set)
-            logging.info("Validated dataset schema for numerical datatype for train set")
-            
-            # Validating numerical columns with Test Dataframe
-            test_num_datatype_status = self.is_numerical_column_exists(self.test_set)
-            logging.info("Validated dataset schema for numerical datatype for test set")
-            
-            logging.info(
-                "Exited validate_dataset_schema_for_numerical_datatype method of Data_Validation class"
-            )            
-            return train_num_datatype_status, test_num_datatype_status
-
-        except Exception as e:
-            raise ShippingException(e, sys) from e
-         
-    
-    def validate_is_categorical_column_exists(self) -> Tuple[bool, bool]:
-        """
-        Method Name: validate_is_categorical_column_exists
-
-        Description: This method validates whether catgorical columns exist in the train and test dataframes.
-
-        Output: A tuple containing two boolean values:
-            - The first value indicates whether categorical columns exist in the train dataframe.
-            - The second value indicates whether categorical columns exist in the test dataframe.
+        Description: This method builds the compact reference profile of the reference dataframe, or takes it
+                     from the column statistics of the reference set, and saves it in artifacts directory, so
+                     that later drift checks never need the reference data.
+        
+        Output: Reference profile
         """
-        logging.info(
-            "Entered validate_dataset_schema_for_categorical_datatype method of Data_Validation class"
-        )
+        logging.info("Entered create_reference_profile method of Data_Validation class")
         try:
-            logging.info("Validating dataset schema for categorical_datatype")
-            
-            # Validating categorical columns with Train Dataframe
-            train_cat_datatype_status = self.is_categorical_column_exists(self.train_set)
-            logging.info("Validated dataset schema for categorical datatype for train set")
-            
-            # Validating categorical columns with Test Dataframe
-            test_cat_datatype_status = self.is_categorical_column_exists(self.test_set)
-            logging.info("Validated dataset schema for categorical datatype for test set")
-            
+            drift_engine = self.data_validation_config.DRIFT_ENGINE
+            if isinstance(reference, DataFrame):
+                reference_profile = drift_engine.build_reference_profile(reference)
+            else:
+                reference_profile = drift_engine.profile_from_statistics(reference)
+            drift_engine.save_profile(
+                reference_profile, self.data_validation_config.REFERENCE_PROFILE_FILE_PATH
+            )
             logging.info(
-                "Exited validate_dataset_schema_for_categorical_datatype method of Data_Validation class"
-            )            
-            return train_cat_datatype_status, test_cat_datatype_status
-
+                f"Saved reference profile to {os.path.basename(self.data_validation_config.REFERENCE_PROFILE_FILE_PATH)}"
+            )
+            logging.info("Exited create_reference_profile method of Data_Validation class")
+            return reference_profile
         except Exception as e:
             raise ShippingException(e, sys) from e
         
     def detect_dataset_drift(
-        self, reference: DataFrame, production: DataFrame, get_ratio: bool = False
+        self, reference: Union[DataFrame, Dict], production: DataFrame, get_ratio: bool = False
     ) -> Union[bool, float]:
         """
         Method Name: detect_dataset_drift
         
-        Description: This method detects whether data drift is present or not
+        Description: This method detects whether data drift is present or not. Numerical columns are
+                     compared with the Kolmogorov-Smirnov test and categorical columns with chi-square or PSI.
+                     The reference is either a dataframe or a reference profile.
         
-        Output: Report in json format and drift status True or False
+        Output: Report in compact json lines format and drift status True or False
         """
         try:
-            data_drift_profile = Profile(sections=[DataDriftProfileSection()])
-            data_drift_profile.calculate(reference, production)
-            
-            # Getting data drift report in json format
-            report = data_drift_profile.json()
-            json_report = json.loads(report)
+            drift_engine = self.data_validation_config.DRIFT_ENGINE
+            if isinstance(reference, DataFrame):
+                report = drift_engine.calculate(reference, production)
+            else:
+                report = drift_engine.calculate_against_profile(reference, production)
             
-            # Saving the json report in artifacts directory
+            # Saving the report in artifacts directory
             data_drift_file_path = self.data_validation_config.DATA_DRIFT_FILE_PATH
-            self.data_validation_config.UTILS.write_json_to_yaml_file(
-                json_report, data_drift_file_path
-            )
-            n_features = json_report["data_drift"]["data"]["metrics"]["n_features"]
-            n_drifted_features = json_report["data_drift"]["data"]["metrics"]["n_drifted_features"]
+            drift_engine.save_report(report, data_drift_file_path)
+            n_features = report["metrics"]["n_features"]
+            n_drifted_features = report["metrics"]["n_drifted_features"]
             
             if get_ratio:
                 return n_drifted_features / n_features # Calculating the drift ratio
             else:
-                return json_report["data_drift"]["data"]["metrics"]["dataset_drift"]
+                return report["metrics"]["dataset_drift"]
         except Exception as e:
             raise ShippingException(e, sys) from e
         
@@ -221,13 +192,21 @@ class DataValidation:
         logging.info("Entered initiate_data_validation method of Data_Validation Class")
         try:
             
-            # Reading the Train and Test data from the data ingestion artifacts folder
-            self.train_set = pd.read_csv(
-                self.data_ingestion_artifacts.train_data_file_path
+            # Reading the column statistics and the Test data from the data ingestion artifacts folder,
+            # the train set is only needed through its statistics
+            self.column_statistics = load_column_statistics(
+                self.data_ingestion_artifacts.column_statistics_file_path
             )
-            self.test_set = pd.read_csv(
+            self.test_set = self.data_validation_config.UTILS.load_dataframe(
                 self.data_ingestion_artifacts.test_data_file_path
             )
+            if self.column_statistics is None:
+                self.column_statistics = compute_train_test_statistics(
+                    self.data_validation_config.UTILS.load_dataframe(
+                        self.data_ingestion_artifacts.train_data_file_path
+                    ),
+                    self.test_set,
+                )
             
             logging.info("Initiated data validation for dataset")
             
@@ -239,55 +218,23 @@ class DataValidation:
                 f"Created Artifacts directory for {os.path.basename(self.data_validation_config.DATA_VALIDATION_ARTIFACTS_DIR)}"
             )
             
-            # Checking the dataset drift
-            drift = self.detect_dataset_drift(self.train_set, self.test_set)
-            (
-                schema_train_col_status,
-                schema_test_col_status,
-            ) = self.validate_dataset_schema_columns()
-            logging.info(
-                f"Schema train cols status is {schema_train_col_status} and schema test cols status is {schema_test_col_status}"
-            )
-            logging.info("Validated dataset schema columns")
+            # Taking the reference profile from the train statistics and checking the dataset drift against it
+            reference_profile = self.create_reference_profile(self.column_statistics["train"])
+            drift = self.detect_dataset_drift(reference_profile, self.test_set)
+            schema_status, _ = self.validate_dataset_schema()
+            logging.info("Validated dataset schema")
             
-            (
-                schema_train_cat_cols_status,
-                schema_test_cat_cols_status,
-            ) = self.validate_is_categorical_column_exists()
-            logging.info(
-                f"Schema train cat cols status is {schema_train_cat_cols_status} and schema test cat cols status is {schema_test_cat_cols_status}"
-            )
-            logging.info("Validated dataset schema for categorical datatype")
-            
-            (
-                schema_train_num_cols_status,
-                schema_test_num_cols_status,
-            ) = self.validate_is_numerical_column_exists()
-            logging.info(
-                f"Schema train num cols status is {schema_train_num_cols_status} and schema test num cols status is {schema_test_num_cols_status}"
-            )
-            logging.info("Validated dataset schema for numerical datatype")
-            
-            # Checking drift status, initially the status is None
-            drift_status = None
-            if (
-                schema_train_cat_cols_status is True
-                and schema_test_cat_cols_status is True
-                and schema_train_num_cols_status is True
-                and schema_test_num_cols_status is True
-                and schema_train_col_status is True
-                and schema_test_col_status is True
-                and drift is False
-            ):
+            # Data is valid when both sets match the schema and there is no dataset drift
+            validation_status = bool(schema_status and not drift)
+            if validation_status:
                 logging.info("Dataset schema validation completed successfully")
-                drift_status == True
-            else:
-                drift_status = False
                 
             # Saving data validation artifacts
             data_validation_artifacts = DataValidationArtifacts(
                 data_drift_file_path=self.data_validation_config.DATA_DRIFT_FILE_PATH,
-                validation_status=drift_status,
+                validation_status=validation_status,
+                reference_profile_file_path=self.data_validation_config.REFERENCE_PROFILE_FILE_PATH,
+                schema_report_file_path=self.data_validation_config.SCHEMA_REPORT_FILE_PATH,
             )
             
             return data_validation_artifacts
@@ -1,7 +1,6 @@
 import os
 import sys
 from dataclasses import dataclass
-import pandas as pd
 from pandas import DataFrame
 from shipping_price.logger import logging
 from shipping_price.exception import ShippingException
@@ -76,7 +75,11 @@ class ModelEvaluation:
         logging.info("Entered the evaluate_model method of Model Evaluation class")
         try:
             # Reading the test data and splitting it into train and test
-            test_df = pd.read_csv(self.data_ingestion_artifact.test_data_file_path)
+            test_df = self.model_evaluation_config.UTILS.load_dataframe(
+                self.data_ingestion_artifact.test_data_file_path,
+                columns=self.model_evaluation_config.MODEL_COLUMNS,
+                memory_map=True,
+            )
             x, y = test_df.drop(TARGET_COLUMN, axis=1), test_df[TARGET_COLUMN]
             logging.info("splitted the test data into train and test")
             
@@ -1,8 +1,8 @@
 import os
 import sys
-import pandas as pd
-from typing import List, Tuple
-from pandas import DataFrame
+import numpy as np
+from typing import List, Optional, Tuple
+from scipy.sparse import csr_matrix
 from shipping_price.exception import ShippingException
 from shipping_price.logger import logging
 from shipping_price.constant import MODEL_CONFIG_FILE
@@ -14,22 +14,36 @@ from shipping_price.entity.artifacts_entity import (
 
 
 class CostModel:
-    def __init__(self, preprocessing_object: object, trained_model_object: object):
+    def __init__(
+        self,
+        preprocessing_object: object,
+        trained_model_object: object,
+        compiled_transform: Optional[object] = None,
+        use_compiled_transform: bool = True,
+    ):
         self.preprocessing_object = preprocessing_object
         self.trained_model_object = trained_model_object
+        self.compiled_transform = compiled_transform
+        self.use_compiled_transform = use_compiled_transform
         
     def predict(self, X) -> float:
         """
         Method Name: predict
         
-        Description: This method predicts the data
+        Description: This method predicts the data. The features are transformed with the compiled transform
+                     when the model has one and use_compiled_transform is set, otherwise with the preprocessor.
+                     The compiled transform also takes a dict or a list of dicts with one shipment each.
         
         Output: Predictions
         """
         logging.info("Entering predict method the class")
         try:
-            # Using the trained model to get predictions
-            transformed_feature = self.preprocessing_object.transform(X)
+            # Using the trained model to get predictions, models saved before compiled transforms lack both attributes
+            compiled_transform = getattr(self, "compiled_transform", None)
+            if compiled_transform is not None and getattr(self, "use_compiled_transform", False):
+                transformed_feature = compiled_transform.transform(X)
+            else:
+                transformed_feature = self.preprocessing_object.transform(X)
             logging.info("Used the trained model to get predictions")
             
             return self.trained_model_object.predict(transformed_feature)
@@ -57,12 +71,12 @@ class ModelTrainer:
         
     # This method is used to get the trained models
     def get_trained_models(
-        self, x_data: DataFrame, y_data: DataFrame
+        self, x_train: csr_matrix, y_train: np.ndarray, x_test: csr_matrix, y_test: np.ndarray
     ) -> List[Tuple[float, object, str]]:
         """
         Method Name: get_trained_models
 
-        Description: This method lists of trained models.
+        Description: This method lists of trained models. The models are trained directly on the sparse features.
 
         Output: List of trained models
         """
@@ -75,14 +89,6 @@ class ModelTrainer:
             models_list = list(model_config["train_model"].keys())
             logging.info("Got model list from the config file")
             
-            # Splitting the data in x_train, y_train, x_test and y_test
-            x_train, y_train, x_test, y_test = (
-                x_data.drop(x_data.columns[len(x_data.columns) -1], axis=1),
-                x_data.iloc[:, -1],
-                y_data.drop(y_data.columns[len(y_data.columns) -1], axis=1),
-                y_data.iloc[:, -1],
-            )
-            
             # Getting the trained model list
             tuned_model_list = [
                 (
@@ -118,26 +124,30 @@ class ModelTrainer:
                 f"Created artifacts directory for {os.path.basename(self.model_trainer_config.DATA_TRANSFORMATION_ARTIFACTS_DIR)}"
             )
             
-            # Loading the train array data and reading it as a Dataframe
-            train_array = self.model_trainer_config.UTILS.load_numpy_array_data(
-                self.data_transformation_artifacts.transformed_train_file_path
+            # Memory mapping the float32 train features and train target, the arrays are passed on as views
+            x_train = self.model_trainer_config.UTILS.load_sparse_array_data(
+                self.data_transformation_artifacts.transformed_train_file_path, mmap_mode="r"
+            )
+            y_train = self.model_trainer_config.UTILS.load_numpy_array_data(
+                self.data_transformation_artifacts.transformed_train_target_file_path, mmap_mode="r"
             )
-            train_df = pd.DataFrame(train_array)
             logging.info(
-                f"Loaded train array from DataTransformationArtifacts directory and converted into dataframe"
+                f"Loaded train features and target from DataTransformationArtifacts directory"
             )
             
-            # Loading the test array data and reading it as a Dataframe
-            test_array = self.model_trainer_config.UTILS.load_numpy_array_data(
-                self.data_transformation_artifacts.transformed_test_file_path
+            # Memory mapping the float32 test features and test target
+            x_test = self.model_trainer_config.UTILS.load_sparse_array_data(
+                self.data_transformation_artifacts.transformed_test_file_path, mmap_mode="r"
+            )
+            y_test = self.model_trainer_config.UTILS.load_numpy_array_data(
+                self.data_transformation_artifacts.transformed_test_target_file_path, mmap_mode="r"
             )
-            test_df = pd.DataFrame(test_array)
             logging.info(
-                f"Loaded test array from DataTransformationArtifacts directory and converted into dataframe"
+                f"Loaded test features and target from DataTransformationArtifacts directory"
             )
             
             # getting the models list and finding the best model with score
-            list_of_trained_models = self.get_trained_models(train_df, test_df)
+            list_of_trained_models = self.get_trained_models(x_train, y_train, x_test, y_test)
             logging.info("Got a list of tuple of model score, model and model name")
             (
                 best_model,
@@ -156,6 +166,20 @@ class ModelTrainer:
             )
             logging.info("Loaded preprocessing object")
             
+            # Compiling the preprocessor for low latency scoring, it is only exported when it matches exactly
+            compiled_transform = None
+            if self.model_trainer_config.COMPILED_TRANSFORM:
+                from shipping_price.utils.compiled_transform import CompiledTransform
+
+                compiled_transform = CompiledTransform.compile(preprocessing_obj)
+                if compiled_transform.check_parity(preprocessing_obj):
+                    logging.info("Compiled the preprocessor, it matches the preprocessor output exactly")
+                else:
+                    compiled_transform = None
+                    logging.warning(
+                        "Compiled transform does not match the preprocessor, scoring uses the preprocessor"
+                    )
+            
             # Reading model config files for getting the best model score
             model_config = self.model_trainer_config.UTILS.read_yaml_file(
                 filename=MODEL_CONFIG_FILE
@@ -168,7 +192,7 @@ class ModelTrainer:
                 # logging.info("Updating model score in yaml file.")
                 
                 # Loading cost model object with preprocessor and model
-                cost_model = CostModel(preprocessing_obj, best_model)
+                cost_model = CostModel(preprocessing_obj, best_model, compiled_transform)
                 logging.info(
                     "Created cost model object with preprocessor and model"
                 )
@@ -0,0 +1,140 @@
+import sys
+import threading
+from typing import Callable, Dict
+from shipping_price.constant import (
+    DB_URL,
+    MONGO_MAX_POOL_SIZE,
+    S3_ENDPOINT_URL,
+    S3_MAX_POOL_CONNECTIONS,
+)
+from shipping_price.exception import ShippingException
+from shipping_price.logger import logging
+
+MONGO_CLIENT = "mongo"
+S3_CLIENT = "s3_client"
+S3_RESOURCE = "s3_resource"
+
+
+def _create_mongo_client() -> object:
+    from pymongo import MongoClient
+
+    return MongoClient(DB_URL, maxPoolSize=MONGO_MAX_POOL_SIZE)
+
+
+def _create_s3_client() -> object:
+    import boto3
+    from botocore.config import Config
+
+    return boto3.session.Session().client(
+        "s3",
+        endpoint_url=S3_ENDPOINT_URL,
+        config=Config(max_pool_connections=S3_MAX_POOL_CONNECTIONS),
+    )
+
+
+def _create_s3_resource() -> object:
+    import boto3
+
+    # Sessions are not thread safe either, every resource gets its own
+    return boto3.session.Session().resource("s3", endpoint_url=S3_ENDPOINT_URL)
+
+
+class ClientRegistry:
+    """
+    Process wide registry of the MongoDB and S3 clients. A client is created on first use and then
+    shared by every component and every pipeline run of the process. Tests can register stand-ins
+    (for example a mongomock client) before the first use. The MongoDB client and the low level S3
+    client are thread safe and shared, boto3 resources are not, so every thread gets its own S3 resource.
+    """
+
+    _lock = threading.Lock()
+    _clients: Dict[str, object] = {}
+    _thread_clients = threading.local()
+    _factories: Dict[str, Callable[[], object]] = {
+        MONGO_CLIENT: _create_mongo_client,
+        S3_CLIENT: _create_s3_client,
+    }
+
+    @classmethod
+    def get_client(cls, name: str) -> object:
+        """
+        Method Name: get_client
+
+        Description: This method returns the shared client registered as name, creating it on first use
+
+        Output: Client object
+        """
+        try:
+            client = cls._clients.get(name)
+            if client is None:
+                with cls._lock:
+                    # Checking again, another thread may have created it while we waited for the lock
+                    client = cls._clients.get(name)
+                    if client is None:
+                        logging.info(f"Creating shared {name} client")
+                        client = cls._factories[name]()
+                        cls._clients[name] = client
+            return client
+
+        except Exception as e:
+            raise ShippingException(e, sys) from e
+
+    @classmethod
+    def get_mongo_client(cls) -> object:
+        return cls.get_client(MONGO_CLIENT)
+
+    @classmethod
+    def get_s3_client(cls) -> object:
+        return cls.get_client(S3_CLIENT)
+
+    @classmethod
+    def get_s3_resource(cls) -> object:
+        """
+        Method Name: get_s3_resource
+
+        Description: This method returns the S3 resource of the calling thread, creating it on first use in
+                     that thread. A registered stand-in is shared instead.
+
+        Output: S3 resource object
+        """
+        try:
+            resource = cls._clients.get(S3_RESOURCE) or getattr(cls._thread_clients, S3_RESOURCE, None)
+            if resource is None:
+                logging.info(f"Creating {S3_RESOURCE} client for thread {threading.current_thread().name}")
+                resource = _create_s3_resource()
+                setattr(cls._thread_clients, S3_RESOURCE, resource)
+            return resource
+
+        except Exception as e:
+            raise ShippingException(e, sys) from e
+
+    @classmethod
+    def register(cls, name: str, client: object) -> None:
+        """
+        Method Name: register
+
+        Description: This method registers client as the shared client for name, used to point the
+                     pipeline at local stand-ins
+
+        Output: None
+        """
+        with cls._lock:
+            cls._clients[name] = client
+
+    @classmethod
+    def reset(cls) -> None:
+        """
+        Method Name: reset
+
+        Description: This method closes and forgets every shared client, the next use creates new ones
+
+        Output: None
+        """
+        with cls._lock:
+            for name, client in cls._clients.items():
+                close = getattr(client, "close", None)
+                if callable(close):
+                    close()
+            cls._clients = {}
+            # Per thread resources of other threads cannot be reached, they are dropped with the old storage
+            cls._thread_clients = threading.local()
@@ -1,21 +1,40 @@
 import sys
-from json import loads
-from typing import Collection
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from typing import TYPE_CHECKING, Collection, Dict, Iterator, List
 from pandas import DataFrame
-from pymongo.database import Database
 import pandas as pd
-from pymongo import MongoClient
-from shipping_price.constant import DB_URL
+from shipping_price.configuration.client_registry import ClientRegistry
+from shipping_price.constant import (
+    DB_URL,
+    MONGO_BATCH_SIZE,
+    MONGO_INSERT_BATCH_SIZE,
+    MONGO_INSERT_WRITERS,
+    MONGO_PARTITION_MIN_DOCUMENTS,
+)
 from shipping_price.exception import ShippingException
 from shipping_price.logger import logging
 
+if TYPE_CHECKING:
+    from pymongo import MongoClient
+    from pymongo.database import Database
+
 
 class MongoDBOperation:
-    def __init__(self):
+    def __init__(self, client: "MongoClient" = None):
         self.DB_URL = DB_URL
-        self.client = MongoClient(self.DB_URL)
+        # Tests can pass a mongomock client, otherwise the process wide pooled client is used
+        self._client = client
+
+    @property
+    def client(self) -> "MongoClient":
+        # Created lazily on first use and shared by every reader thread and pipeline run
+        if self._client is not None:
+            return self._client
+        return ClientRegistry.get_mongo_client()
         
-    def get_database(self, db_name) -> Database:
+    def get_database(self, db_name) -> "Database":
         
         """
         Method Name: get_database
@@ -64,17 +83,27 @@ class MongoDBOperation:
             raise ShippingException(e, sys) from e
         
         
-    def get_collection_as_dataframe(self, db_name, collection_name) -> DataFrame:
+    def iter_collection_batches(
+        self,
+        db_name,
+        collection_name,
+        batch_size: int = MONGO_BATCH_SIZE,
+        dtypes: Dict = None,
+        pipeline: List[Dict] = None,
+        keep_id: bool = False,
+    ) -> Iterator[DataFrame]:
 
         """
-        Method Name: get_collection_as_dataframe
+        Method Name: iter_collection_batches
 
-        Description: This method is used for converting the selected collection to dataframe
+        Description: This method walks the collection cursor and yields it as dataframe chunks of batch_size rows
 
-        Output: A collection is returned from the selected db_name and collection_name
+        Output: An iterator of dataframe chunks, typed with dtypes when given. When an aggregation
+                pipeline is given it is run server side and its output is streamed instead of the raw collection.
+                With keep_id the _id column is kept as its hex string instead of being dropped
         """
 
-        logging.info("Entered the get_collection_as_dataframe method of MongoDB_Operation class")
+        logging.info("Entered the iter_collection_batches method of MongoDB_Operation class")
 
         try:
             # Getting the database
@@ -83,11 +112,173 @@ class MongoDBOperation:
             # Getting the collection name
             collection = database.get_collection(name=collection_name)
 
-            # Reading the dataframe and dropping the _id column
-            df = pd.DataFrame(list(collection.find()))
-            if "_id" in df.columns.to_list():
-                df = df.drop(columns=["_id"], axis=1)
+            # Only batch_size documents are held as python dicts at any time
+            if pipeline is None:
+                cursor = collection.find(batch_size=batch_size)
+            else:
+                cursor = collection.aggregate(pipeline, batchSize=batch_size, allowDiskUse=True)
+            n_batches = 0
+            while True:
+                documents = list(islice(cursor, batch_size))
+                if len(documents) == 0:
+                    break
+
+                # Building the column chunk and dropping the _id column
+                chunk = pd.DataFrame.from_records(documents)
+                del documents
+                if "_id" in chunk.columns:
+                    if keep_id:
+                        chunk["_id"] = chunk["_id"].astype(str)
+                    else:
+                        chunk = chunk.drop(columns=["_id"])
+
+                if dtypes is not None:
+                    chunk = chunk.astype(
+                        {col: dtype for col, dtype in dtypes.items() if col in chunk.columns}
+                    )
+
+                n_batches += 1
+                yield chunk
+
+            logging.info(f"Read {n_batches} batches of upto {batch_size} documents from {collection_name}")
+            logging.info("Exited the iter_collection_batches method of MongoDB_Operation class")
+
+        except Exception as e:
+            raise ShippingException(e, sys) from e
+
+
+    def get_partition_bounds(
+        self,
+        db_name,
+        collection_name,
+        n_partitions: int,
+        partition_key: str = "_id",
+        match: Dict = None,
+        min_partition_documents: int = MONGO_PARTITION_MIN_DOCUMENTS,
+    ) -> List[object]:
+
+        """
+        Method Name: get_partition_bounds
+
+        Description: This method splits the documents selected by match into at most n_partitions ranges of
+                     roughly equal document count on partition_key, with one $bucketAuto aggregation over
+                     the matched documents only. A watermark delta therefore costs a pass over the delta and
+                     not over the collection. Fewer than two partitions of min_partition_documents are not
+                     worth splitting and give no bounds.
+
+        Output: Sorted list of the inner range boundaries, empty when the documents are read with one cursor
+        """
+
+        logging.info("Entered the get_partition_bounds method of MongoDB_Operation class")
+
+        try:
+            collection = self.get_database(db_name).get_collection(name=collection_name)
+            pipeline = [
+                {"$match": match or {}},
+                {"$project": {partition_key: 1}},
+                {"$bucketAuto": {"groupBy": f"${partition_key}", "buckets": n_partitions}},
+            ]
+            try:
+                # Buckets never split a value, so repeated values of a non unique key stay in one range
+                buckets = list(collection.aggregate(pipeline, allowDiskUse=True))
+            except NotImplementedError:
+                logging.info("$bucketAuto is not supported by the client, reading with one cursor")
+                return []
+
+            n_documents = sum(bucket["count"] for bucket in buckets)
+            if n_documents < 2 * min_partition_documents:
+                logging.info(f"Matched {n_documents} documents, reading with one cursor")
+                return []
+            bounds = [bucket["_id"]["min"] for bucket in buckets[1:]]
+
+            logging.info(
+                f"Split {n_documents} matched documents of {collection_name} into {len(bounds) + 1} partitions on {partition_key}"
+            )
+            logging.info("Exited the get_partition_bounds method of MongoDB_Operation class")
+            return bounds
+
+        except Exception as e:
+            raise ShippingException(e, sys) from e
+
+
+    def get_collection_as_dataframe(
+        self,
+        db_name,
+        collection_name,
+        batch_size: int = MONGO_BATCH_SIZE,
+        dtypes: Dict = None,
+        pipeline: List[Dict] = None,
+        keep_id: bool = False,
+        n_partitions: int = 1,
+        partition_key: str = "_id",
+    ) -> DataFrame:
+
+        """
+        Method Name: get_collection_as_dataframe
+
+        Description: This method is used for converting the selected collection to dataframe. With n_partitions
+                     greater than 1 the documents matched by the pipeline are split into ranges on partition_key
+                     which are read concurrently and assembled in range order. Small matches, such as most
+                     watermark deltas, are read with a single cursor.
+
+        Output: A collection is returned from the selected db_name and collection_name
+        """
+
+        logging.info("Entered the get_collection_as_dataframe method of MongoDB_Operation class")
+
+        try:
+            # Reading one range of the collection batch by batch
+            def read_partition(partition_pipeline: List[Dict]) -> List[DataFrame]:
+                return list(
+                    self.iter_collection_batches(
+                        db_name,
+                        collection_name,
+                        batch_size=batch_size,
+                        dtypes=dtypes,
+                        pipeline=partition_pipeline,
+                        keep_id=keep_id,
+                    )
+                )
+
+            bounds = []
+            if n_partitions > 1:
+                # Bounds are taken inside the leading $match of the pipeline, such as the watermark delta
+                match = pipeline[0]["$match"] if pipeline and "$match" in pipeline[0] else None
+                bounds = self.get_partition_bounds(
+                    db_name, collection_name, n_partitions, partition_key=partition_key, match=match
+                )
                 
+            if len(bounds) == 0:
+                chunks = read_partition(pipeline)
+            else:
+                lower_bounds = [None] + bounds
+                upper_bounds = bounds + [None]
+
+                # Range filter goes in front so that MongoDB can use the index on partition_key
+                partition_pipelines = []
+                for lower, upper in zip(lower_bounds, upper_bounds):
+                    key_range = {}
+                    if lower is not None:
+                        key_range["$gte"] = lower
+                    if upper is not None:
+                        key_range["$lt"] = upper
+                    range_stage = {"$match": {partition_key: key_range} if key_range else {}}
+                    partition_pipelines.append([range_stage] + list(pipeline or []))
+
+                # map keeps the partitions in range order
+                with ThreadPoolExecutor(max_workers=len(partition_pipelines)) as executor:
+                    partition_chunks = list(executor.map(read_partition, partition_pipelines))
+                chunks = [chunk for partition in partition_chunks for chunk in partition]
+                del partition_chunks
+                logging.info(f"Read {len(partition_pipelines)} partitions concurrently")
+
+            # Concatenating the typed chunks
+            if len(chunks) == 0:
+                df = pd.DataFrame()
+            else:
+                df = pd.concat(chunks, ignore_index=True)
+            del chunks
+
             logging.info(f"Converted collection to dataframe")
             logging.info("Exited the get_collection_as_dataframe method of MongoDB_Operation class")
             return df
@@ -96,29 +287,72 @@ class MongoDBOperation:
             raise ShippingException(e, sys) from e
         
         
-    def insert_dataframe_as_record(self, data_frame, db_name, collection_name) -> None:
+    @staticmethod
+    def dataframe_to_records(data_frame: DataFrame) -> List[Dict]:
+        """
+        Method Name: dataframe_to_records
+        
+        Description: This method converts the dataframe rows to BSON ready dicts. The whole chunk is boxed to
+                     python objects in one vectorized step and missing values become None.
+        
+        Output: List of records
+        """
+        try:
+            columns = list(data_frame.columns)
+            values = data_frame.astype(object).where(data_frame.notna(), None)
+            return [dict(zip(columns, row)) for row in values.itertuples(index=False, name=None)]
+        
+        except Exception as e:
+            raise ShippingException(e, sys) from e
+        
+        
+    def insert_dataframe_as_record(
+        self,
+        data_frame,
+        db_name,
+        collection_name,
+        batch_size: int = MONGO_INSERT_BATCH_SIZE,
+        n_writers: int = MONGO_INSERT_WRITERS,
+    ) -> float:
         """
         Method Name: insert_dataframe_as_record
         
-        Description: This method inserts the dataframe as record in the database collection
+        Description: This method inserts the dataframe as record in the database collection. The dataframe is
+                     converted in chunks of batch_size rows which are written with unordered insert_many calls
+                     spread over n_writers threads.
         
-        Output: The dataframe is inserted into the database collection
+        Output: The dataframe is inserted into the database collection, the insert rate in rows/sec is returned
         """
         logging.info("Entered the insert_dataframe_as_record method of MongoDB_Operation class")
         
         try:
-            # Converting dataframe into json
-            records = loads(data_frame.T.to_json()).values()
-            logging.info(f"Converted dataframe to json records")
-            
             # getting the database and collection
             database = self.get_database(db_name) 
             collection = database.get_collection(collection_name)
             logging.info("Inserting records to MongoDB")
             
-            # Inserting data to MongoDB database
-            collection.insert_many(records)
-            logging.info("Inserted records to MongoDB")
+            start_time = time.perf_counter()
+            n_rows = len(data_frame)
+            with ThreadPoolExecutor(max_workers=n_writers) as executor:
+                pending = []
+                for start in range(0, n_rows, batch_size):
+                    # Converting the next chunk while the writers are busy with the previous ones
+                    records = self.dataframe_to_records(data_frame.iloc[start : start + batch_size])
+                    pending.append(
+                        executor.submit(collection.insert_many, records, ordered=False)
+                    )
+                    
+                    # Bounding the number of converted chunks held in memory
+                    if len(pending) >= 2 * n_writers:
+                        pending.pop(0).result()
+                        
+                for future in pending:
+                    future.result()
+                    
+            elapsed = time.perf_counter() - start_time
+            rows_per_sec = n_rows / elapsed if elapsed > 0 else float(n_rows)
+            logging.info(f"Inserted {n_rows} records to MongoDB at {rows_per_sec:.0f} rows/sec")
             logging.info("Exiting the insert_dataframe_as_record method of MongoDB_Operation class")
+            return rows_per_sec
         except Exception as e:
-            raise ShippingException(e, sys) from e
\ No newline at end of file
+            raise ShippingException(e, sys) from e
@@ -2,19 +2,25 @@ import os
 import pickle
 import sys
 from io import StringIO
-from typing import List, Union
+from typing import TYPE_CHECKING, List, Union
 
-import boto3
-from botocore.exceptions import ClientError
+from shipping_price.configuration.client_registry import ClientRegistry
 from shipping_price.exception import ShippingException
 from shipping_price.logger import logging
-from mypy_boto3_s3.service_resource import Bucket
 from pandas import DataFrame, read_csv
 
+if TYPE_CHECKING:
+    from mypy_boto3_s3.service_resource import Bucket
+
 class S3Operation:
-    def __init__(self):
-        self.s3_client = boto3.client("s3")
-        self.s3_resource = boto3.resource("s3")
+    # The client is created lazily on first use and shared across the process, resources are per thread
+    @property
+    def s3_client(self):
+        return ClientRegistry.get_s3_client()
+
+    @property
+    def s3_resource(self):
+        return ClientRegistry.get_s3_resource()
 
     @staticmethod
     def read_object(
@@ -42,7 +48,7 @@ class S3Operation:
         except Exception as e:
             raise ShippingException(e, sys) from e
 
-    def get_bucket(self, bucket_name: str) -> Bucket:
+    def get_bucket(self, bucket_name: str) -> "Bucket":
         """
         Method Name :   get_bucket
         Description :   This method gets the bucket object based on the bucket_name
@@ -147,9 +153,10 @@ class S3Operation:
         On Failure  :   Write an exception log and then raise an exception
         """
         logging.info("Entered the create_folder method of S3Operations class")
+        from botocore.exceptions import ClientError
 
         try:
-            self.s3_resource.Object(bucket_name, folder_name).load()
+            self.s3_client.head_object(Bucket=bucket_name, Key=folder_name)
 
         except ClientError as e:
             if e.response["Error"]["Code"] == "404":
@@ -180,7 +187,7 @@ class S3Operation:
                 f"Uploading {from_filename} file to {to_filename} file in {bucket_name} bucket"
             )
 
-            self.s3_resource.meta.client.upload_file(
+            self.s3_client.upload_file(
                 from_filename, bucket_name, to_filename
             )
 
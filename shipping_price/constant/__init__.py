@@ -11,11 +11,21 @@ MODEL_CONFIG_FILE = "configs/model.yaml"
 SCHEMA_CONFIG_FILE = "configs/schema.yaml"
 
 DB_URL = os.getenv("MONGODB_URL")
+S3_ENDPOINT_URL = os.getenv("S3_ENDPOINT_URL")
+S3_MAX_POOL_CONNECTIONS = 10
 
 TARGET_COLUMN = "Cost"
 DB_NAME = "iNeuron"
 COLLECTION_NAME = "shipping_price"
 TEST_SIZE = 0.2
+RANDOM_STATE = 42
+MONGO_BATCH_SIZE = 10000
+MONGO_MAX_POOL_SIZE = 16
+MONGO_READ_PARTITIONS = 4
+MONGO_PARTITION_KEY = "_id"
+MONGO_PARTITION_MIN_DOCUMENTS = 100000
+MONGO_INSERT_BATCH_SIZE = 10000
+MONGO_INSERT_WRITERS = 4
 
 ARTIFACTS_DIR = os.path.join(from_root(), "artifacts", TIMESTAMP)
 
@@ -25,14 +35,38 @@ Data Ingestion related constant start with DATA_INGESTION VAR NAME
 DATA_INGESTION_ARTIFACTS_DIR = "DataIngestionArtifacts"
 DATA_INGESTION_TRAIN_DIR = "Train"
 DATA_INGESTION_TEST_DIR = "Test"
-DATA_INGESTION_TRAIN_FILE_NAME = "train.csv"
-DATA_INGESTION_TEST_FILE_NAME = "test.csv"
+DATA_INGESTION_TRAIN_FILE_NAME = "train.parquet"
+DATA_INGESTION_TEST_FILE_NAME = "test.parquet"
+DATA_INGESTION_COLUMN_STATISTICS_FILE_NAME = "column_statistics.json"
+DATA_INGESTION_SNAPSHOT_DIR = os.path.join(from_root(), "artifacts", "IngestionSnapshot")
+DATA_INGESTION_SNAPSHOT_FILE_NAME = "snapshot.parquet"
+DATA_INGESTION_WATERMARK_METADATA_KEY = "shipping_price.watermark"
+INCREMENTAL_INGESTION = False
+CATEGORY_MAX_CARDINALITY = 255
+SPLIT_MODE = "hash"
+SPLIT_KEY = "_id"
+SPLIT_HASH_BUCKETS = 10000
+WATERMARK_FIELD = "_id"
 
 """
 Data Validation related constant start with DATA_VALIDATION VAR NAME
 """
 DATA_VALIDATION_ARTIFACTS_DIR = "DataValidationArtifacts"
-DATA_DRIFT_FILE_NAME = "DataDriftReport.yaml"
+DATA_DRIFT_FILE_NAME = "DataDriftReport.jsonl"
+DATA_REFERENCE_PROFILE_FILE_NAME = "reference_profile.json"
+SCHEMA_VALIDATION_REPORT_FILE_NAME = "SchemaValidationReport.json"
+DRIFT_P_VALUE_THRESHOLD = 0.05
+DRIFT_PROFILE_QUANTILES = 201
+DRIFT_SHARE_THRESHOLD = 0.5
+DRIFT_CATEGORICAL_STATTEST = "chisquare"
+DRIFT_PSI_THRESHOLD = 0.1
+DRIFT_SAMPLING = True
+DRIFT_SAMPLE_CONFIDENCE = 0.99
+DRIFT_SAMPLE_EPSILON = 0.01
+DRIFT_SAMPLE_STRATA_COLUMN = "Transport"
+DRIFT_MONITOR_WINDOW_BATCHES = 50
+DRIFT_N_WORKERS = os.cpu_count() or 1
+DRIFT_MONITOR_MIN_ROWS = 500
 
 """
 Data Transformation related constant start with DATA_TRANSFORMATION VAR NAME
@@ -40,8 +74,17 @@ Data Transformation related constant start with DATA_TRANSFORMATION VAR NAME
 DATA_TRANSFORMATION_ARTIFACTS_DIR = "DataTransformationArtifacts"
 TRANSFORMED_TRAIN_DATA_DIR = "TransformedTrain"
 TRANSFORMED_TEST_DATA_DIR = "TransformedTest"
-TRANSFORMED_TRAIN_DATA_FILE_NAME = "transformed_train_data.npz"
-TRANSFORMED_TEST_DATA_FILE_NAME = "transformed_test_data.npz"
+TRANSFORMED_TRAIN_DATA_FILE_NAME = "transformed_train_data"
+TRANSFORMED_TEST_DATA_FILE_NAME = "transformed_test_data"
+TRANSFORMED_DTYPE = "float32"
+TRANSFORMATION_CHUNKED = False
+TRANSFORMATION_CHUNK_SIZE = 100000
+OUTLIER_SKETCH_SIZE = 10000
+TRANSFORMATION_CACHE = True
+TRANSFORMATION_CACHE_DIR = os.path.join(from_root(), "artifacts", "TransformationCache")
+TRANSFORMATION_CACHE_MAX_BYTES = 5 * 1024 ** 3
+TRANSFORMED_TRAIN_TARGET_FILE_NAME = "transformed_train_target.npy"
+TRANSFORMED_TEST_TARGET_FILE_NAME = "transformed_test_target.npy"
 PREPROCESSOR_OBJECT_FILE_NAME = "shipping_preprocessor.pkl"
 
 """
@@ -50,6 +93,7 @@ Model Trainer related constant start with MODEL_TRAINER VAR NAME
 MODEL_TRAINER_ARTIFACTS_DIR = "ModelTrainerArtifacts"
 MODEL_FILE_NAME = "shipping_price_model.pkl"
 MODEL_SAVE_FORMAT = ".pkl"
+MODEL_TRAINER_COMPILED_TRANSFORM = True
 
 """
 Model Evaluation related constant start with MODEL_EVALUATION VAR NAME
@@ -1,15 +1,19 @@
 from dataclasses import dataclass
+from typing import Optional
 
 
 @dataclass
 class DataIngestionArtifacts:
     train_data_file_path: str
     test_data_file_path: str
+    column_statistics_file_path: Optional[str] = None
     
 @dataclass
 class DataValidationArtifacts:
     data_drift_file_path: str
     validation_status: bool
+    reference_profile_file_path: str
+    schema_report_file_path: str
     
 
 @dataclass
@@ -17,6 +21,8 @@ class DataTransformationArtifacts:
     transformed_train_file_path: str
     transformed_test_file_path: str
     transformed_object_file_path: str
+    transformed_train_target_file_path: str
+    transformed_test_target_file_path: str
     
 @dataclass
 class ModelTrainerArtifacts:
@@ -3,9 +3,22 @@ from dataclasses import dataclass
 from from_root import from_root
 from shipping_price.configuration.s3_operations import S3Operation
 from shipping_price.utils.main_utils import MainUtils
+from shipping_price.utils.drift_engine import DriftEngine
 from shipping_price.constant import *
 
 
+def get_model_columns(schema_config: dict) -> list:
+    # Columns used by the preprocessor and the target, in schema order without duplicates
+    return list(
+        dict.fromkeys(
+            schema_config["onehot_columns"]
+            + schema_config["binary_columns"]
+            + schema_config["numerical_columns"]
+            + [schema_config["target_column"]]
+        )
+    )
+
+
 @dataclass
 class DataIngestionConfig:
     def __init__(self):
@@ -13,7 +26,15 @@ class DataIngestionConfig:
         self.SCHEMA_CONFIG = self.UTILS.read_yaml_file(filename=SCHEMA_CONFIG_FILE)
         self.DB_NAME = DB_NAME
         self.COLLECTION_NAME = COLLECTION_NAME
+        self.READ_PARTITIONS: int = MONGO_READ_PARTITIONS
+        self.PARTITION_KEY: str = MONGO_PARTITION_KEY
         self.DROP_COLS = list(self.SCHEMA_CONFIG["drop_columns"])
+        self.SCHEMA_DTYPES = {
+            col: dtype.strip()
+            for column in self.SCHEMA_CONFIG["columns"]
+            for col, dtype in column.items()
+        }
+        self.KEEP_COLS = [col for col in self.SCHEMA_DTYPES if col not in self.DROP_COLS]
         self.DATA_INGESTION_ARTIFACTS_DIR: str = os.path.join(
             from_root(), ARTIFACTS_DIR, DATA_INGESTION_ARTIFACTS_DIR
         )
@@ -29,18 +50,44 @@ class DataIngestionConfig:
         self.TEST_DATA_FILE_PATH: str = os.path.join(
             self.TEST_DATA_ARTIFACTS_FILE_DIR, DATA_INGESTION_TEST_FILE_NAME
         )
+        self.COLUMN_STATISTICS_FILE_PATH: str = os.path.join(
+            self.DATA_INGESTION_ARTIFACTS_DIR, DATA_INGESTION_COLUMN_STATISTICS_FILE_NAME
+        )
+        self.INCREMENTAL_INGESTION: bool = INCREMENTAL_INGESTION
+        self.WATERMARK_FIELD: str = WATERMARK_FIELD
+        self.SPLIT_MODE: str = SPLIT_MODE
+        self.SPLIT_KEY: str = SPLIT_KEY
+        self.SNAPSHOT_DIR: str = DATA_INGESTION_SNAPSHOT_DIR
+        self.SNAPSHOT_FILE_PATH: str = os.path.join(
+            self.SNAPSHOT_DIR, DATA_INGESTION_SNAPSHOT_FILE_NAME
+        )
         
 @dataclass
 class DataValidationConfig:
     def __init__(self):
         self.UTILS = MainUtils()
         self.SCHEMA_CONFIG = self.UTILS.read_yaml_file(filename=SCHEMA_CONFIG_FILE)
+        self.SCHEMA_DTYPES = {
+            col: dtype.strip()
+            for column in self.SCHEMA_CONFIG["columns"]
+            for col, dtype in column.items()
+        }
+        self.EXPECTED_COLS = [
+            col for col in self.SCHEMA_DTYPES if col not in self.SCHEMA_CONFIG["drop_columns"]
+        ]
         self.DATA_VALIDATION_ARTIFACTS_DIR: str = os.path.join(
             from_root(), ARTIFACTS_DIR, DATA_VALIDATION_ARTIFACTS_DIR
         )
         self.DATA_DRIFT_FILE_PATH: str = os.path.join(
             self.DATA_VALIDATION_ARTIFACTS_DIR, DATA_DRIFT_FILE_NAME
         )
+        self.SCHEMA_REPORT_FILE_PATH: str = os.path.join(
+            self.DATA_VALIDATION_ARTIFACTS_DIR, SCHEMA_VALIDATION_REPORT_FILE_NAME
+        )
+        self.REFERENCE_PROFILE_FILE_PATH: str = os.path.join(
+            self.DATA_VALIDATION_ARTIFACTS_DIR, DATA_REFERENCE_PROFILE_FILE_NAME
+        )
+        self.DRIFT_ENGINE = DriftEngine()
         
     
 @dataclass
@@ -48,6 +95,13 @@ class DataTransformationConfig:
     def __init__(self):
         self.UTILS = MainUtils()
         self.SCHEMA_CONFIG = self.UTILS.read_yaml_file(filename=SCHEMA_CONFIG_FILE)
+        self.MODEL_COLUMNS = get_model_columns(self.SCHEMA_CONFIG)
+        self.CHUNKED: bool = TRANSFORMATION_CHUNKED
+        self.CHUNK_SIZE: int = TRANSFORMATION_CHUNK_SIZE
+        self.OUTLIER_SKETCH_SIZE: int = OUTLIER_SKETCH_SIZE
+        self.CACHE: bool = TRANSFORMATION_CACHE
+        self.CACHE_DIR: str = TRANSFORMATION_CACHE_DIR
+        self.CACHE_MAX_BYTES: int = TRANSFORMATION_CACHE_MAX_BYTES
         self.DATA_TRANSFORMATION_ARTIFACTS_DIR: str = os.path.join(
             from_root(), ARTIFACTS_DIR, DATA_TRANSFORMATION_ARTIFACTS_DIR
         )
@@ -63,6 +117,12 @@ class DataTransformationConfig:
         self.TRANSFORMED_TEST_FILE_PATH: str = os.path.join(
             self.TRANSFORMED_TEST_DATA_DIR, TRANSFORMED_TEST_DATA_FILE_NAME
         )
+        self.TRANSFORMED_TRAIN_TARGET_FILE_PATH: str = os.path.join(
+            self.TRANSFORMED_TRAIN_DATA_DIR, TRANSFORMED_TRAIN_TARGET_FILE_NAME
+        )
+        self.TRANSFORMED_TEST_TARGET_FILE_PATH: str = os.path.join(
+            self.TRANSFORMED_TEST_DATA_DIR, TRANSFORMED_TEST_TARGET_FILE_NAME
+        )
         self.PREPROCESSOR_FILE_PATH: str = os.path.join(
             from_root(),
             ARTIFACTS_DIR,
@@ -86,6 +146,7 @@ class ModelTrainerConfig:
         self.TRAINED_MODEL_FILE_PATH = os.path.join(
             from_root(), ARTIFACTS_DIR, MODEL_TRAINER_ARTIFACTS_DIR, MODEL_FILE_NAME
         )
+        self.COMPILED_TRANSFORM = MODEL_TRAINER_COMPILED_TRANSFORM
         
 
 @dataclass
@@ -93,6 +154,8 @@ class ModelEvaluationConfig:
     def __init__(self):
         self.S3_OPERATIONS = S3Operation()
         self.UTILS = MainUtils()
+        self.SCHEMA_CONFIG = self.UTILS.read_yaml_file(filename=SCHEMA_CONFIG_FILE)
+        self.MODEL_COLUMNS = get_model_columns(self.SCHEMA_CONFIG)
         self.BUCKET_NAME: str = BUCKET_NAME
         self.BEST_MODEL_PATH: str = os.path.join(
             from_root(), ARTIFACTS_DIR, MODEL_TRAINER_ARTIFACTS_DIR, MODEL_FILE_NAME
@@ -0,0 +1,74 @@
+import os
+import shutil
+import sys
+import numpy as np
+from shipping_price.exception import ShippingException
+
+# Bytes copied at a time when the appended data is moved behind the .npy header
+COPY_BUFFER_SIZE = 16 * 1024 ** 2
+
+
+class NpyAppendWriter:
+    """
+    Writes a 1-D .npy file from chunks whose total length is not known up front. Chunks are appended as
+    raw bytes to a temporary file and moved behind the .npy header on close, so memory stays bounded by
+    one chunk however long the array grows.
+    """
+
+    def __init__(self, file_path: str, dtype):
+        self.file_path = file_path
+        self.dtype = np.dtype(dtype)
+        self.length = 0
+        self.tmp_file_path = file_path + ".tmp"
+        self.tmp_file = open(self.tmp_file_path, "wb")
+
+    def append(self, array: np.ndarray) -> None:
+        array = np.ascontiguousarray(array, dtype=self.dtype)
+        self.tmp_file.write(array.tobytes())
+        self.length += len(array)
+
+    def close(self) -> str:
+        try:
+            self.tmp_file.close()
+            with open(self.file_path, "wb") as npy_file, open(self.tmp_file_path, "rb") as tmp_file:
+                np.lib.format.write_array_header_1_0(
+                    npy_file,
+                    {"descr": np.lib.format.dtype_to_descr(self.dtype), "fortran_order": False, "shape": (self.length,)},
+                )
+                shutil.copyfileobj(tmp_file, npy_file, COPY_BUFFER_SIZE)
+            os.remove(self.tmp_file_path)
+            return self.file_path
+
+        except Exception as e:
+            raise ShippingException(e, sys) from e
+
+
+class CsrAppendWriter:
+    """
+    Writes a CSR matrix chunk of rows by chunk of rows in the layout read by MainUtils.load_sparse_array_data,
+    one .npy file per CSR component in dir_path.
+    """
+
+    def __init__(self, dir_path: str, dtype):
+        os.makedirs(dir_path, exist_ok=True)
+        self.dir_path = dir_path
+        self.data = NpyAppendWriter(os.path.join(dir_path, "data.npy"), dtype)
+        self.indices = NpyAppendWriter(os.path.join(dir_path, "indices.npy"), np.int32)
+        self.indptr = NpyAppendWriter(os.path.join(dir_path, "indptr.npy"), np.int64)
+        self.indptr.append(np.zeros(1))
+        self.n_rows, self.n_cols, self.nnz = 0, 0, 0
+
+    def append(self, array) -> None:
+        self.data.append(array.data)
+        self.indices.append(array.indices)
+        # Row pointers of the chunk are offset by the non zeros already written
+        self.indptr.append(array.indptr[1:].astype(np.int64) + self.nnz)
+        self.nnz += array.nnz
+        self.n_rows += array.shape[0]
+        self.n_cols = array.shape[1]
+
+    def close(self) -> str:
+        for writer in [self.data, self.indices, self.indptr]:
+            writer.close()
+        np.save(os.path.join(self.dir_path, "shape.npy"), np.array([self.n_rows, self.n_cols], dtype=np.int64))
+        return self.dir_path
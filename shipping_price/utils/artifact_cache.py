@@ -0,0 +1,175 @@
+import hashlib
+import json
+import os
+import shutil
+import sys
+import time
+from typing import Dict, Iterable, List, Optional
+from shipping_price.exception import ShippingException
+from shipping_price.logger import logging
+
+# Bytes hashed at a time when fingerprinting files
+HASH_BUFFER_SIZE = 1024 ** 2
+# File touched on every hit, its modification time orders entries for eviction
+LAST_USED_FILE_NAME = ".last_used"
+
+
+class ArtifactCache:
+    """
+    Local cache of artifact directories keyed by a fingerprint of everything that produced them. Entries are
+    written to a temporary directory and renamed into place, so a crashed run never leaves a partial entry.
+    When the cache grows past max_bytes the least recently used entries are evicted. Files are copied into
+    and out of the cache rather than hard linked, since the artifact writers overwrite their files in place
+    and a shared inode would let a later run rewrite a cached entry under its old fingerprint.
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+
+    @staticmethod
+    def fingerprint(file_paths: Iterable[str], config: Dict) -> str:
+        """
+        Method Name: fingerprint
+
+        Description: This method hashes the content of the files in order together with the json encoded config
+
+        Output: Hex digest of the fingerprint
+        """
+        try:
+            digest = hashlib.sha256()
+            for file_path in file_paths:
+                with open(file_path, "rb") as file_obj:
+                    for block in iter(lambda: file_obj.read(HASH_BUFFER_SIZE), b""):
+                        digest.update(block)
+                digest.update(b"\0")
+            digest.update(json.dumps(config, sort_keys=True, default=str).encode())
+            return digest.hexdigest()
+
+        except Exception as e:
+            raise ShippingException(e, sys) from e
+
+    @staticmethod
+    def copy_file(source: str, destination: str) -> None:
+        os.makedirs(os.path.dirname(destination), exist_ok=True)
+        if os.path.exists(destination):
+            os.remove(destination)
+        shutil.copy2(source, destination)
+
+    @staticmethod
+    def list_files(root_dir: str, relative_paths: List[str]) -> List[str]:
+        # Files below every relative path, which is either a file or a directory
+        files = []
+        for relative_path in relative_paths:
+            path = os.path.join(root_dir, relative_path)
+            if os.path.isdir(path):
+                for dir_path, _, file_names in os.walk(path):
+                    files += [os.path.relpath(os.path.join(dir_path, name), root_dir) for name in file_names]
+            else:
+                files.append(relative_path)
+        return sorted(files)
+
+    def entry_dir(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key)
+
+    def restore(self, key: str, destination_dir: str) -> Optional[List[str]]:
+        """
+        Method Name: restore
+
+        Description: This method copies the files of the cache entry into destination_dir when the entry exists
+
+        Output: Relative paths of the restored files, None on a cache miss
+        """
+        logging.info("Entered the restore method of ArtifactCache class")
+        try:
+            entry_dir = self.entry_dir(key)
+            if not os.path.isdir(entry_dir):
+                logging.info(f"Artifact cache miss for {key}")
+                return None
+
+            files = [
+                file for file in self.list_files(entry_dir, os.listdir(entry_dir)) if file != LAST_USED_FILE_NAME
+            ]
+            for file in files:
+                self.copy_file(os.path.join(entry_dir, file), os.path.join(destination_dir, file))
+            self.touch(key)
+            logging.info(f"Artifact cache hit for {key}, restored {len(files)} files")
+            logging.info("Exited the restore method of ArtifactCache class")
+            return files
+
+        except Exception as e:
+            raise ShippingException(e, sys) from e
+
+    def store(self, key: str, source_dir: str, relative_paths: List[str]) -> str:
+        """
+        Method Name: store
+
+        Description: This method adds the files below relative_paths of source_dir to the cache under key and
+                     evicts the least recently used entries beyond max_bytes
+
+        Output: Cache entry directory
+        """
+        logging.info("Entered the store method of ArtifactCache class")
+        try:
+            entry_dir = self.entry_dir(key)
+            tmp_dir = f"{entry_dir}.{os.getpid()}.tmp"
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            for file in self.list_files(source_dir, relative_paths):
+                self.copy_file(os.path.join(source_dir, file), os.path.join(tmp_dir, file))
+
+            if os.path.isdir(entry_dir):
+                shutil.rmtree(tmp_dir)
+            else:
+                os.replace(tmp_dir, entry_dir)
+            self.touch(key)
+            self.evict()
+            logging.info("Exited the store method of ArtifactCache class")
+            return entry_dir
+
+        except Exception as e:
+            raise ShippingException(e, sys) from e
+
+    def touch(self, key: str) -> None:
+        with open(os.path.join(self.entry_dir(key), LAST_USED_FILE_NAME), "w") as last_used_file:
+            last_used_file.write(str(time.time()))
+
+    @staticmethod
+    def dir_size(dir_path: str) -> int:
+        return sum(
+            os.path.getsize(os.path.join(path, name)) for path, _, names in os.walk(dir_path) for name in names
+        )
+
+    def evict(self) -> List[str]:
+        """
+        Method Name: evict
+
+        Description: This method removes the least recently used entries until the cache fits in max_bytes,
+                     the most recently used entry is always kept
+
+        Output: Keys of the evicted entries
+        """
+        try:
+            entries = []
+            for key in os.listdir(self.cache_dir):
+                entry_dir = self.entry_dir(key)
+                if key.endswith(".tmp") or not os.path.isdir(entry_dir):
+                    continue
+                last_used_file = os.path.join(entry_dir, LAST_USED_FILE_NAME)
+                last_used = os.path.getmtime(last_used_file if os.path.exists(last_used_file) else entry_dir)
+                entries.append((last_used, key, self.dir_size(entry_dir)))
+
+            entries.sort()
+            total_bytes = sum(size for _, _, size in entries)
+            evicted = []
+            for _, key, size in entries[:-1]:
+                if total_bytes <= self.max_bytes:
+                    break
+                shutil.rmtree(self.entry_dir(key), ignore_errors=True)
+                total_bytes -= size
+                evicted.append(key)
+            if len(evicted) > 0:
+                logging.info(f"Evicted {len(evicted)} artifact cache entries, cache size is {total_bytes} bytes")
+            return evicted
+
+        except Exception as e:
+            raise ShippingException(e, sys) from e
@@ -0,0 +1,115 @@
+import json
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional, Tuple
+import numpy as np
+import pandas as pd
+from pandas import DataFrame, Series
+from pandas.api.types import is_bool_dtype, is_numeric_dtype
+from shipping_price.constant import DRIFT_PROFILE_QUANTILES
+from shipping_price.exception import ShippingException
+from shipping_price.logger import logging
+
+
+def is_numerical(column: Series) -> bool:
+    # Category, object and bool columns are treated as categories
+    return is_numeric_dtype(column.dtype) and not is_bool_dtype(column.dtype)
+
+
+def quantile_sketch(sorted_values: np.ndarray, probabilities: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Method Name: quantile_sketch
+
+    Description: This method takes the quantiles of already sorted non null values at the probabilities
+                 together with the exact CDF at every quantile. Sketch points are observed values, so the
+                 CDF at them is exact.
+
+    Output: Sketch points and the CDF at the sketch points
+    """
+    if len(sorted_values) == 0:
+        return np.array([]), np.array([])
+    quantiles = np.unique(np.quantile(sorted_values, probabilities, method="inverted_cdf"))
+    cdf = np.searchsorted(sorted_values, quantiles, side="right") / len(sorted_values)
+    return quantiles, cdf
+
+
+def compute_column_statistics(df: DataFrame, n_quantiles: int = DRIFT_PROFILE_QUANTILES) -> Dict:
+    """
+    Method Name: compute_column_statistics
+
+    Description: This method computes the statistics of every column in one scan. All numerical columns are
+                 sorted together once, then null counts, distinct counts, min, max, quartiles and the
+                 quantile sketch with its CDF are read off the sorted columns. Categorical columns keep
+                 their frequency table and their levels in order of first appearance.
+
+    Output: Column statistics of the dataframe
+    """
+    logging.info("Entered the compute_column_statistics method")
+    try:
+        probabilities = np.linspace(0, 1, n_quantiles)
+        numerical_columns = [col for col in df.columns if is_numerical(df[col])]
+        statistics = {"n_rows": int(len(df)), "columns": {}}
+
+        # nan sorts last, so the non null values of every column are a prefix of its sorted column
+        sorted_X = np.sort(df[numerical_columns].to_numpy(dtype=np.float64), axis=0)
+        n_valid = (~np.isnan(sorted_X)).sum(axis=0)
+        for i, col in enumerate(numerical_columns):
+            values = sorted_X[: n_valid[i], i]
+            quantiles, cdf = quantile_sketch(values, probabilities)
+            has_values = len(values) > 0
+            statistics["columns"][col] = {
+                "column_type": "num",
+                "dtype": str(df[col].dtype),
+                "n": int(len(values)),
+                "null_count": int(len(df) - len(values)),
+                "null_rate": (len(df) - len(values)) / max(len(df), 1),
+                "n_unique": int(1 + np.count_nonzero(np.diff(values))) if has_values else 0,
+                "min": float(values[0]) if has_values else None,
+                "max": float(values[-1]) if has_values else None,
+                "quartiles": np.quantile(values, [0.25, 0.75]).tolist() if has_values else [None, None],
+                "quantiles": quantiles.tolist(),
+                "cdf": cdf.tolist(),
+            }
+
+        for col in df.columns:
+            if col in statistics["columns"]:
+                continue
+            values = df[col].dropna().astype(str)
+            frequencies = values.value_counts()
+            statistics["columns"][col] = {
+                "column_type": "cat",
+                "dtype": str(df[col].dtype),
+                "n": int(len(values)),
+                "null_count": int(len(df) - len(values)),
+                "null_rate": (len(df) - len(values)) / max(len(df), 1),
+                "n_unique": int(len(frequencies)),
+                "frequencies": {str(k): int(v) for k, v in frequencies.items()},
+                "levels": pd.unique(values).tolist(),
+            }
+        logging.info("Exited the compute_column_statistics method")
+        return statistics
+
+    except Exception as e:
+        raise ShippingException(e, sys) from e
+
+
+def compute_train_test_statistics(train_set: DataFrame, test_set: DataFrame) -> Dict:
+    # The two frames are scanned concurrently, the sorts and value counts release the GIL
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        train_statistics, test_statistics = executor.map(compute_column_statistics, [train_set, test_set])
+    return {"train": train_statistics, "test": test_statistics}
+
+
+def save_column_statistics(statistics: Dict, file_path: str) -> str:
+    with open(file_path, "w") as statistics_file:
+        json.dump(statistics, statistics_file)
+    return file_path
+
+
+def load_column_statistics(file_path: Optional[str]) -> Optional[Dict]:
+    # Artifacts of runs without a statistics file give None, callers then scan the data themselves
+    if file_path is None or not os.path.exists(file_path):
+        return None
+    with open(file_path, "r") as statistics_file:
+        return json.load(statistics_file)
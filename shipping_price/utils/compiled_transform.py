@@ -0,0 +1,322 @@
+import math
+import numbers
+import sys
+from typing import Callable, Dict, List, Mapping, Optional, Tuple
+import numpy as np
+import pandas as pd
+from pandas import DataFrame
+from shipping_price.exception import ShippingException
+from shipping_price.logger import logging
+
+# Value standing in for a category never seen at fit time in the parity sample
+UNKNOWN_CATEGORY = "__unknown__"
+
+
+def is_nan(value) -> bool:
+    # The one-hot encoder matches its nan category with float nan only, None is a category of its own
+    # and other missing markers such as pd.NA are unknown
+    return isinstance(value, numbers.Real) and math.isnan(value)
+
+
+class CategoryTable:
+    """
+    Lookup table of one categorical column. Row i of table is the encoded block of the i-th known category,
+    the last two rows are the encodings of unknown and missing values. is_missing tells which values the
+    encoder treats as missing.
+    """
+
+    def __init__(self, index: Dict, table: np.ndarray, is_missing: Callable = pd.isna):
+        self.index = index
+        self.table = table
+        self.is_missing = is_missing
+        self.unknown_code = len(table) - 2
+        self.missing_code = len(table) - 1
+
+    def code(self, value) -> int:
+        code = self.index.get(value)
+        if code is not None:
+            return code
+        return self.missing_code if self.is_missing(value) else self.unknown_code
+
+    def encode(self, values) -> np.ndarray:
+        return self.table[np.fromiter((self.code(value) for value in values), dtype=np.intp, count=len(values))]
+
+
+class CompiledTransform:
+    """
+    NumPy only copy of a fitted preprocessor for low latency scoring. One-hot and binary encoders become
+    lookup tables indexed by category, the outlier capper and the standard scaler of the numerical columns
+    run in place on one array. The numerical steps keep the operation order and dtypes of sklearn, so the
+    output is bit for bit the output of the preprocessor. Inputs are dataframes, a dict or list of dicts
+    with one shipment each, or arrays with the columns in the order the preprocessor was fitted on.
+    """
+
+    def __init__(
+        self,
+        feature_names_in: List[str],
+        n_features_out: int,
+        sparse_output: bool,
+        categorical_blocks: List[Tuple[str, int, CategoryTable]],
+        numerical_columns: List[str],
+        numerical_offset: int,
+        numerical_steps: Dict[str, Optional[np.ndarray]],
+    ):
+        self.feature_names_in = feature_names_in
+        self.n_features_out = n_features_out
+        self.sparse_output = sparse_output
+        self.categorical_blocks = categorical_blocks
+        self.numerical_columns = numerical_columns
+        self.numerical_offset = numerical_offset
+        self.numerical_steps = numerical_steps
+        self.column_position = {col: i for i, col in enumerate(feature_names_in)}
+
+    @staticmethod
+    def onehot_tables(encoder, columns: List[str], offset: int) -> List[Tuple[str, int, CategoryTable]]:
+        # One-hot columns of unknown categories stay zero, as with handle_unknown="ignore"
+        if encoder.drop_idx_ is not None or encoder.handle_unknown != "ignore" or encoder._infrequent_enabled:
+            raise ValueError(
+                "Only OneHotEncoder(handle_unknown='ignore') without dropped or infrequent categories compiles"
+            )
+        blocks = []
+        for col, categories in zip(columns, encoder.categories_):
+            # A None category is looked up like any other, nan values share the row of the nan category
+            known = [category for category in categories if not is_nan(category)]
+            table = np.zeros((len(known) + 2, len(categories)), dtype=np.float64)
+            table[np.arange(len(known)), np.arange(len(known))] = 1.0
+            if len(known) < len(categories):
+                # sklearn sorts the nan category last
+                table[-1, -1] = 1.0
+            index = {category: i for i, category in enumerate(known)}
+            blocks.append((col, offset, CategoryTable(index, table, is_missing=is_nan)))
+            offset += len(categories)
+        return blocks
+
+    @staticmethod
+    def binary_tables(encoder, offset: int) -> List[Tuple[str, int, CategoryTable]]:
+        # The bits of every ordinal code are read off the fitted mapping, -1 is unknown and -2 is missing, the
+        # ordinal encoder fills every missing marker with nan first
+        if encoder.handle_unknown != "value" or encoder.handle_missing != "value" or encoder.drop_invariant:
+            raise ValueError(
+                "Only BinaryEncoder(handle_unknown='value', handle_missing='value') without dropped columns compiles"
+            )
+        ordinal_mappings = {mapping["col"]: mapping["mapping"] for mapping in encoder.ordinal_encoder.mapping}
+        blocks = []
+        for mapping in encoder.mapping:
+            col, bits = mapping["col"], mapping["mapping"]
+            ordinals = ordinal_mappings[col]
+            known = [(category, ordinal) for category, ordinal in ordinals.items() if not pd.isna(category)]
+            codes = [ordinal for _, ordinal in known] + [-1, -2]
+            table = bits.loc[codes].to_numpy(dtype=np.float64)
+            blocks.append((col, offset, CategoryTable({category: i for i, (category, _) in enumerate(known)}, table)))
+            offset += bits.shape[1]
+        return blocks
+
+    @staticmethod
+    def numerical_steps_of(transformer) -> Dict[str, Optional[np.ndarray]]:
+        from sklearn.pipeline import Pipeline
+        from sklearn.preprocessing import StandardScaler
+        from shipping_price.utils.preprocessing import OutlierCapper
+
+        steps = {"lower": None, "upper": None, "mean": None, "scale": None}
+        estimators = [step for _, step in transformer.steps] if isinstance(transformer, Pipeline) else [transformer]
+        if [type(step) for step in estimators] not in (
+            [OutlierCapper, StandardScaler], [OutlierCapper], [StandardScaler]
+        ):
+            raise ValueError(f"Numerical transformer {transformer} does not compile")
+        for step in estimators:
+            if isinstance(step, OutlierCapper):
+                steps["lower"], steps["upper"] = step.lower_, step.upper_
+            else:
+                steps["mean"], steps["scale"] = step.mean_, step.scale_
+        return steps
+
+    @classmethod
+    def compile(cls, preprocessor) -> "CompiledTransform":
+        """
+        Method Name: compile
+
+        Description: This method compiles a fitted ColumnTransformer of one-hot encoders, binary encoders and
+                     numerical outlier capping and scaling into lookup tables and arrays
+
+        Output: Compiled transform
+        """
+        logging.info("Entered the compile method of CompiledTransform class")
+        try:
+            from category_encoders.binary import BinaryEncoder
+            from sklearn.preprocessing import OneHotEncoder
+
+            categorical_blocks, numerical_columns, numerical_offset, numerical_steps = [], [], 0, None
+            for name, transformer, columns in preprocessor.transformers_:
+                if name == "remainder":
+                    if transformer != "drop":
+                        raise ValueError("Only a dropped remainder compiles")
+                    continue
+                offset = preprocessor.output_indices_[name].start
+                if isinstance(transformer, OneHotEncoder):
+                    categorical_blocks += cls.onehot_tables(transformer, list(columns), offset)
+                elif isinstance(transformer, BinaryEncoder):
+                    categorical_blocks += cls.binary_tables(transformer, offset)
+                elif numerical_steps is None:
+                    numerical_steps = cls.numerical_steps_of(transformer)
+                    numerical_columns, numerical_offset = list(columns), offset
+                else:
+                    raise ValueError(f"Transformer {name} does not compile")
+
+            compiled = cls(
+                feature_names_in=list(preprocessor.feature_names_in_),
+                n_features_out=max(indices.stop for indices in preprocessor.output_indices_.values()),
+                sparse_output=bool(preprocessor.sparse_output_),
+                categorical_blocks=categorical_blocks,
+                numerical_columns=numerical_columns,
+                numerical_offset=numerical_offset,
+                numerical_steps=numerical_steps or {"lower": None, "upper": None, "mean": None, "scale": None},
+            )
+            logging.info("Exited the compile method of CompiledTransform class")
+            return compiled
+
+        except Exception as e:
+            raise ShippingException(e, sys) from e
+
+    def numerical_array(self, X) -> np.ndarray:
+        # Dataframes keep their dtypes as in sklearn, records and arrays are read as float64
+        if isinstance(X, DataFrame):
+            return np.asarray(X[self.numerical_columns])
+        if isinstance(X, np.ndarray):
+            positions = [self.column_position[col] for col in self.numerical_columns]
+            return X[:, positions].astype(np.float64)
+        return np.array([[record[col] for col in self.numerical_columns] for record in X], dtype=np.float64)
+
+    def column_values(self, X, col: str):
+        if isinstance(X, DataFrame):
+            return X[col].to_numpy()
+        if isinstance(X, np.ndarray):
+            return X[:, self.column_position[col]]
+        return [record[col] for record in X]
+
+    def transform(self, X):
+        """
+        Method Name: transform
+
+        Description: This method encodes the categorical columns through their lookup tables and caps and
+                     scales the numerical columns in place, in the same order and dtypes as the preprocessor
+
+        Output: Transformed features, sparse when the preprocessor output is sparse
+        """
+        if isinstance(X, Mapping):
+            X = [X]
+        elif isinstance(X, np.ndarray) and X.ndim == 1:
+            X = X.reshape(1, -1)
+        n_rows = len(X)
+        out = np.zeros((n_rows, self.n_features_out), dtype=np.float64)
+
+        for col, offset, table in self.categorical_blocks:
+            out[:, offset : offset + table.table.shape[1]] = table.encode(self.column_values(X, col))
+
+        if len(self.numerical_columns) > 0:
+            values = self.numerical_array(X)
+            if not np.issubdtype(values.dtype, np.floating):
+                values = values.astype(np.float64)
+            steps = self.numerical_steps
+            if steps["lower"] is not None:
+                values = np.clip(values, steps["lower"].astype(values.dtype), steps["upper"].astype(values.dtype))
+            else:
+                values = values.copy()
+            # In place in the input dtype as StandardScaler.transform, which keeps float32 outputs exact
+            if steps["mean"] is not None:
+                np.subtract(values, steps["mean"], out=values, casting="same_kind")
+            if steps["scale"] is not None:
+                np.divide(values, steps["scale"], out=values, casting="same_kind")
+            out[:, self.numerical_offset : self.numerical_offset + len(self.numerical_columns)] = values
+
+        if self.sparse_output:
+            from scipy.sparse import csr_matrix
+
+            return csr_matrix(out)
+        return out
+
+    def parity_sample(self, min_rows: int = 64) -> DataFrame:
+        """
+        Method Name: parity_sample
+
+        Description: This method builds a sample holding every known category, an unknown category and the
+                     None and nan missing values of each categorical column, and for each numerical column
+                     values inside and beyond the capping bounds and around the scaler mean
+
+        Output: Parity sample
+        """
+        columns = {}
+        for col, _, table in self.categorical_blocks:
+            columns[col] = list(table.index) + [UNKNOWN_CATEGORY, None, np.nan]
+        steps = self.numerical_steps
+        for j, col in enumerate(self.numerical_columns):
+            values = [0.0, np.nan]
+            if steps["mean"] is not None:
+                mean = steps["mean"][j]
+                scale = steps["scale"][j] if steps["scale"] is not None else 1.0
+                values += list(mean + scale * np.array([-6.0, -1.0, -0.5, -1e-3, 0.0, 0.5, 1.0, 6.0]))
+            if steps["lower"] is not None:
+                bounds = np.array([steps["lower"][j], steps["upper"][j]])
+                bounds = bounds[np.isfinite(bounds)]
+                values += list(bounds) + list(np.nextafter(bounds, -np.inf)) + list(np.nextafter(bounds, np.inf))
+            columns[col] = values
+
+        n_rows = max([min_rows] + [len(values) for values in columns.values()])
+        sample = DataFrame(
+            {
+                col: [values[(i + j) % len(values)] for i in range(n_rows)]
+                for j, (col, values) in enumerate(columns.items())
+            }
+        )
+        return sample[[col for col in self.feature_names_in if col in sample.columns]].astype(
+            {col: object for col, _, _ in self.categorical_blocks}
+        )
+
+    def check_parity(self, preprocessor, X: Optional[DataFrame] = None) -> bool:
+        """
+        Method Name: check_parity
+
+        Description: This method transforms X, by default the parity sample in float64 and float32, with the
+                     compiled transform as a dataframe and as records and with the preprocessor, and checks
+                     that the outputs are identical
+
+        Output: Whether the compiled transform matches the preprocessor exactly
+        """
+        logging.info("Entered the check_parity method of CompiledTransform class")
+        try:
+            if X is None:
+                sample = self.parity_sample()
+                samples = [sample, sample.astype({col: np.float32 for col in self.numerical_columns})]
+            else:
+                samples = [X]
+
+            for sample in samples:
+                expected = preprocessor.transform(sample)
+                outputs = [self.transform(sample)]
+                if all(sample[col].dtype == np.float64 for col in self.numerical_columns):
+                    outputs.append(self.transform(sample.to_dict("records")))
+                for output in outputs:
+                    if not self.outputs_equal(expected, output):
+                        logging.info("Compiled transform does not match the preprocessor")
+                        return False
+            logging.info(f"Compiled transform matches the preprocessor on {len(samples)} parity samples")
+            logging.info("Exited the check_parity method of CompiledTransform class")
+            return True
+
+        except Exception as e:
+            raise ShippingException(e, sys) from e
+
+    @staticmethod
+    def outputs_equal(expected, output) -> bool:
+        # Sparse outputs must also store the same entries, as tree models read absent entries as missing
+        if hasattr(expected, "toarray") != hasattr(output, "toarray"):
+            return False
+        if hasattr(expected, "toarray"):
+            expected, output = expected.tocsr(), output.tocsr()
+            expected.sort_indices()
+            output.sort_indices()
+            if not (
+                np.array_equal(expected.indptr, output.indptr) and np.array_equal(expected.indices, output.indices)
+            ):
+                return False
+            expected, output = expected.data, output.data
+        return expected.dtype == output.dtype and np.array_equal(expected, output, equal_nan=True)
@@ -0,0 +1,605 @@
+import json
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, List, Tuple
+import numpy as np
+from pandas import DataFrame, Series
+from shipping_price.constant import (
+    DRIFT_CATEGORICAL_STATTEST,
+    DRIFT_N_WORKERS,
+    DRIFT_P_VALUE_THRESHOLD,
+    DRIFT_PROFILE_QUANTILES,
+    DRIFT_PSI_THRESHOLD,
+    DRIFT_SAMPLE_CONFIDENCE,
+    DRIFT_SAMPLE_EPSILON,
+    DRIFT_SAMPLE_STRATA_COLUMN,
+    DRIFT_SAMPLING,
+    DRIFT_SHARE_THRESHOLD,
+    RANDOM_STATE,
+)
+from shipping_price.exception import ShippingException
+from shipping_price.logger import logging
+from shipping_price.utils.column_statistics import is_numerical, quantile_sketch
+from shipping_price.utils.sampling_utils import (
+    cdf_error_bound,
+    required_sample_size,
+    stratified_sample,
+)
+
+# Floor for proportions of categories missing on one side, avoids division by zero and log(0)
+MIN_PROPORTION = 1e-4
+
+
+def finite_values(values: Dict) -> Dict:
+    # NaN and infinity are not valid JSON, they are written as null
+    return {
+        key: finite_values(value)
+        if isinstance(value, dict)
+        else None
+        if isinstance(value, float) and not np.isfinite(value)
+        else value
+        for key, value in values.items()
+    }
+
+
+class DriftEngine:
+    def __init__(
+        self,
+        p_value_threshold: float = DRIFT_P_VALUE_THRESHOLD,
+        drift_share_threshold: float = DRIFT_SHARE_THRESHOLD,
+        categorical_stattest: str = DRIFT_CATEGORICAL_STATTEST,
+        psi_threshold: float = DRIFT_PSI_THRESHOLD,
+        n_profile_quantiles: int = DRIFT_PROFILE_QUANTILES,
+        sampling: bool = DRIFT_SAMPLING,
+        sample_confidence: float = DRIFT_SAMPLE_CONFIDENCE,
+        sample_epsilon: float = DRIFT_SAMPLE_EPSILON,
+        strata_column: str = DRIFT_SAMPLE_STRATA_COLUMN,
+        n_workers: int = DRIFT_N_WORKERS,
+    ):
+        self.p_value_threshold = p_value_threshold
+        self.drift_share_threshold = drift_share_threshold
+        self.categorical_stattest = categorical_stattest
+        self.psi_threshold = psi_threshold
+        self.n_profile_quantiles = n_profile_quantiles
+        self.sampling = sampling
+        self.sample_confidence = sample_confidence
+        self.sample_epsilon = sample_epsilon
+        self.strata_column = strata_column
+        self.n_workers = n_workers
+
+    def map_features(self, func: Callable, items: Iterable) -> List:
+        """
+        Method Name: map_features
+
+        Description: This method applies func to every feature item on a thread pool of n_workers threads.
+                     The per feature work is dominated by NumPy sorting and searching, which releases the
+                     GIL, so threads scale with cores without copying the columns to other processes.
+
+        Output: Results in the order of the items
+        """
+        items = list(items)
+        if self.n_workers <= 1 or len(items) <= 1:
+            return [func(item) for item in items]
+        with ThreadPoolExecutor(max_workers=min(self.n_workers, len(items))) as executor:
+            return list(executor.map(func, items))
+
+    def sample(self, df: DataFrame) -> Tuple[DataFrame, Dict]:
+        """
+        Method Name: sample
+
+        Description: This method takes a stratified reservoir sample of the dataframe when sampling is on and
+                     the dataframe is larger than the sample size needed for sample_epsilon accuracy of the
+                     empirical CDF at sample_confidence. Smaller dataframes are used as they are.
+
+        Output: Sample and its sampling info with the resulting CDF error bound
+        """
+        sample_size = required_sample_size(self.sample_confidence, self.sample_epsilon)
+        if not self.sampling or len(df) <= sample_size:
+            return df, {"rows": int(len(df)), "sample_size": int(len(df)), "cdf_error_bound": 0.0}
+
+        sample = stratified_sample(
+            df, sample_size, strata_column=self.strata_column, seed=RANDOM_STATE
+        )
+        logging.info(f"Sampled {len(sample)} of {len(df)} rows for drift detection")
+        return sample, {
+            "rows": int(len(df)),
+            "sample_size": int(len(sample)),
+            "cdf_error_bound": cdf_error_bound(len(sample), self.sample_confidence),
+        }
+
+    def sampling_report(self, reference_info: Dict, current_info: Dict) -> Dict:
+        # Drift statistics are within the sum of both CDF error bounds of their full data value
+        return {
+            "confidence": self.sample_confidence,
+            "reference_rows": reference_info["rows"],
+            "reference_sample_size": reference_info["sample_size"],
+            "current_rows": current_info["rows"],
+            "current_sample_size": current_info["sample_size"],
+            "statistic_error_bound": reference_info["cdf_error_bound"] + current_info["cdf_error_bound"],
+        }
+
+    # Category, object and bool columns are compared as categories
+    is_numerical = staticmethod(is_numerical)
+
+    @staticmethod
+    def ks_p_value(statistic: np.ndarray, n_reference: np.ndarray, n_current: np.ndarray) -> np.ndarray:
+        """
+        Method Name: ks_p_value
+
+        Description: This method computes the asymptotic two sample Kolmogorov-Smirnov p-value for
+                     arrays of statistics and sample sizes
+
+        Output: Array of p-values
+        """
+        from scipy.special import kolmogorov
+
+        effective_n = np.sqrt(n_reference * n_current / (n_reference + n_current))
+        return np.clip(kolmogorov((effective_n + 0.12 + 0.11 / effective_n) * statistic), 0.0, 1.0)
+
+    @staticmethod
+    def ks_statistic(reference: np.ndarray, current: np.ndarray) -> float:
+        """
+        Method Name: ks_statistic
+
+        Description: This method computes the largest distance between the empirical distribution functions
+                     of the two samples, evaluated at every observed value in one vectorized pass
+
+        Output: Kolmogorov-Smirnov statistic
+        """
+        reference = np.sort(reference[~np.isnan(reference)])
+        current = np.sort(current[~np.isnan(current)])
+        values = np.concatenate([reference, current])
+        reference_cdf = np.searchsorted(reference, values, side="right") / len(reference)
+        current_cdf = np.searchsorted(current, values, side="right") / len(current)
+        return float(np.max(np.abs(reference_cdf - current_cdf)))
+
+    @staticmethod
+    def category_counts(reference: Series, current: Series) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Method Name: category_counts
+
+        Description: This method counts every category of the two samples over their union of categories
+
+        Output: Categories, reference counts and current counts
+        """
+        reference_values = reference.dropna().astype(str).to_numpy()
+        current_values = current.dropna().astype(str).to_numpy()
+        categories, codes = np.unique(
+            np.concatenate([reference_values, current_values]), return_inverse=True
+        )
+        reference_counts = np.bincount(codes[: len(reference_values)], minlength=len(categories))
+        current_counts = np.bincount(codes[len(reference_values) :], minlength=len(categories))
+        return categories, reference_counts, current_counts
+
+    @staticmethod
+    def chi_square_test(reference_counts: np.ndarray, current_counts: np.ndarray) -> Tuple[float, float]:
+        """
+        Method Name: chi_square_test
+
+        Description: This method runs a chi-square goodness of fit test of the current counts against the
+                     category proportions of the reference
+
+        Output: Chi-square statistic and p-value
+        """
+        from scipy.special import chdtrc
+
+        if len(reference_counts) < 2:
+            return 0.0, 1.0
+        reference_prop = np.maximum(reference_counts / reference_counts.sum(), MIN_PROPORTION)
+        expected = reference_prop / reference_prop.sum() * current_counts.sum()
+        statistic = float(np.sum((current_counts - expected) ** 2 / expected))
+        return statistic, float(chdtrc(len(reference_counts) - 1, statistic))
+
+    @staticmethod
+    def psi(reference_counts: np.ndarray, current_counts: np.ndarray) -> float:
+        """
+        Method Name: psi
+
+        Description: This method computes the population stability index between the category proportions
+
+        Output: PSI value
+        """
+        reference_prop = np.maximum(reference_counts / reference_counts.sum(), MIN_PROPORTION)
+        current_prop = np.maximum(current_counts / current_counts.sum(), MIN_PROPORTION)
+        return float(np.sum((current_prop - reference_prop) * np.log(current_prop / reference_prop)))
+
+    def numerical_drift(self, reference: DataFrame, current: DataFrame, columns: List[str]) -> Dict[str, Dict]:
+        """
+        Method Name: numerical_drift
+
+        Description: This method runs the Kolmogorov-Smirnov test on every numerical column, the p-values
+                     of all columns are computed in one vectorized call
+
+        Output: Drift result of every numerical column
+        """
+        if len(columns) == 0:
+            return {}
+        reference_values = reference[columns].to_numpy(dtype=np.float64)
+        current_values = current[columns].to_numpy(dtype=np.float64)
+        n_reference = (~np.isnan(reference_values)).sum(axis=0)
+        n_current = (~np.isnan(current_values)).sum(axis=0)
+        # Columns without values on one side are reported as empty and kept out of the test
+        tested = np.flatnonzero((n_reference > 0) & (n_current > 0))
+        statistics = np.array(
+            self.map_features(lambda i: self.ks_statistic(reference_values[:, i], current_values[:, i]), tested)
+        )
+        p_values = self.ks_p_value(statistics, n_reference[tested], n_current[tested]) if len(tested) > 0 else []
+        features = {
+            columns[i]: {
+                "column_type": "num",
+                "stattest": "ks",
+                "statistic": float(statistic),
+                "p_value": float(p_value),
+                "drift_detected": bool(p_value < self.p_value_threshold),
+            }
+            for i, statistic, p_value in zip(tested, statistics, p_values)
+        }
+        return {
+            col: features[col] if col in features else self.empty_result("num", "ks", n_reference[i], n_current[i])
+            for i, col in enumerate(columns)
+        }
+
+    @staticmethod
+    def empty_result(column_type: str, stattest: str, n_reference: int, n_current: int) -> Dict:
+        """
+        Method Name: empty_result
+
+        Description: This method reports a column with no non null values on one or both sides. A column
+                     that is empty on one side only is flagged as drifted, a column empty on both is not.
+
+        Output: Drift result of the column
+        """
+        return {
+            "column_type": column_type,
+            "stattest": stattest,
+            "statistic": None,
+            "p_value": None,
+            "status": "empty",
+            "n_reference": int(n_reference),
+            "n_current": int(n_current),
+            "drift_detected": bool((n_reference == 0) != (n_current == 0)),
+        }
+
+    def categorical_drift(self, reference: Series, current: Series) -> Dict:
+        """
+        Method Name: categorical_drift
+
+        Description: This method runs the chi-square test or PSI on a categorical column
+
+        Output: Drift result of the column
+        """
+        _, reference_counts, current_counts = self.category_counts(reference, current)
+        return self.categorical_counts_drift(reference_counts, current_counts)
+
+    def categorical_counts_drift(self, reference_counts: np.ndarray, current_counts: np.ndarray) -> Dict:
+        """
+        Method Name: categorical_counts_drift
+
+        Description: This method runs the chi-square test or PSI on category counts aligned on the same categories
+
+        Output: Drift result of the column
+        """
+        n_reference, n_current = reference_counts.sum(), current_counts.sum()
+        if n_reference == 0 or n_current == 0:
+            stattest = "psi" if self.categorical_stattest == "psi" else "chisquare"
+            return self.empty_result("cat", stattest, n_reference, n_current)
+        if self.categorical_stattest == "psi":
+            score = self.psi(reference_counts, current_counts)
+            return {
+                "column_type": "cat",
+                "stattest": "psi",
+                "statistic": score,
+                "p_value": None,
+                "drift_detected": bool(score > self.psi_threshold),
+            }
+        statistic, p_value = self.chi_square_test(reference_counts, current_counts)
+        return {
+            "column_type": "cat",
+            "stattest": "chisquare",
+            "statistic": statistic,
+            "p_value": p_value,
+            "drift_detected": bool(p_value < self.p_value_threshold),
+        }
+
+    def calculate(self, reference: DataFrame, current: DataFrame) -> Dict:
+        """
+        Method Name: calculate
+
+        Description: This method computes the drift of every column present in both dataframes and
+                     summarises it into the dataset drift decision
+
+        Output: Drift report with per feature results and dataset metrics
+        """
+        logging.info("Entered the calculate method of DriftEngine class")
+        try:
+            reference, reference_info = self.sample(reference)
+            current, current_info = self.sample(current)
+            columns = [col for col in reference.columns if col in current.columns]
+            numerical_columns = [col for col in columns if self.is_numerical(reference[col])]
+
+            features = self.numerical_drift(reference, current, numerical_columns)
+            categorical_columns = [col for col in columns if col not in features]
+            features.update(
+                zip(
+                    categorical_columns,
+                    self.map_features(
+                        lambda col: self.categorical_drift(reference[col], current[col]), categorical_columns
+                    ),
+                )
+            )
+            report = self.summarise({col: features[col] for col in columns})
+            report["sampling"] = self.sampling_report(reference_info, current_info)
+            logging.info("Exited the calculate method of DriftEngine class")
+            return report
+
+        except Exception as e:
+            raise ShippingException(e, sys) from e
+
+    def summarise(self, features: Dict[str, Dict]) -> Dict:
+        """
+        Method Name: summarise
+
+        Description: This method summarises the per feature drift results into the dataset drift decision
+
+        Output: Drift report with per feature results and dataset metrics
+        """
+        n_features = len(features)
+        n_drifted_features = sum(result["drift_detected"] for result in features.values())
+        share_of_drifted_features = n_drifted_features / n_features if n_features > 0 else 0.0
+        logging.info(f"Drift detected in {n_drifted_features} of {n_features} features")
+        return {
+            "metrics": {
+                "n_features": n_features,
+                "n_drifted_features": n_drifted_features,
+                "share_of_drifted_features": share_of_drifted_features,
+                "dataset_drift": bool(
+                    n_features > 0 and share_of_drifted_features >= self.drift_share_threshold
+                ),
+            },
+            "features": features,
+        }
+
+    def build_reference_profile(self, reference: DataFrame) -> Dict:
+        """
+        Method Name: build_reference_profile
+
+        Description: This method summarises the reference dataframe into a compact profile. Numerical columns
+                     keep a quantile sketch together with the exact reference CDF at every sketch point,
+                     categorical columns keep their category frequency table. Both keep row and null counts.
+                     Large references are profiled from a sample, which is recorded in the profile.
+
+        Output: Reference profile
+        """
+        logging.info("Entered the build_reference_profile method of DriftEngine class")
+        try:
+            probabilities = np.linspace(0, 1, self.n_profile_quantiles)
+            reference, reference_info = self.sample(reference)
+            columns = dict(
+                zip(
+                    reference.columns,
+                    self.map_features(
+                        lambda col: self.column_profile(reference[col], probabilities), reference.columns
+                    ),
+                )
+            )
+            profile = {"n_rows": reference_info["rows"], "sampling": reference_info, "columns": columns}
+            logging.info("Exited the build_reference_profile method of DriftEngine class")
+            return profile
+
+        except Exception as e:
+            raise ShippingException(e, sys) from e
+
+    def column_profile(self, column: Series, probabilities: np.ndarray) -> Dict:
+        """
+        Method Name: column_profile
+
+        Description: This method profiles one reference column, a quantile sketch with the exact CDF at its
+                     points for numerical columns and the frequency table for categorical columns
+
+        Output: Profile of the column
+        """
+        n_null = int(column.isna().sum())
+        if self.is_numerical(column):
+            values = np.sort(column.dropna().to_numpy(dtype=np.float64))
+            quantiles, cdf = quantile_sketch(values, probabilities)
+            return {
+                "column_type": "num",
+                "n": int(len(values)),
+                "null_rate": n_null / max(len(column), 1),
+                "quantiles": quantiles.tolist(),
+                "cdf": cdf.tolist(),
+            }
+        frequencies = column.dropna().astype(str).value_counts()
+        return {
+            "column_type": "cat",
+            "n": int(frequencies.sum()),
+            "null_rate": n_null / max(len(column), 1),
+            "frequencies": {str(k): int(v) for k, v in frequencies.items()},
+        }
+
+    @staticmethod
+    def profile_from_statistics(statistics: Dict) -> Dict:
+        """
+        Method Name: profile_from_statistics
+
+        Description: This method builds the reference profile from the column statistics artifact of the
+                     reference set, which already holds the sketches and frequency tables of the full set
+
+        Output: Reference profile
+        """
+        n_rows = statistics["n_rows"]
+        return {
+            "n_rows": n_rows,
+            "sampling": {"rows": n_rows, "sample_size": n_rows, "cdf_error_bound": 0.0},
+            "columns": statistics["columns"],
+        }
+
+    @staticmethod
+    def save_profile(profile: Dict, file_path: str) -> str:
+        with open(file_path, "w") as profile_file:
+            json.dump(profile, profile_file)
+        return file_path
+
+    @staticmethod
+    def load_profile(file_path: str) -> Dict:
+        with open(file_path, "r") as profile_file:
+            return json.load(profile_file)
+
+    @staticmethod
+    def save_report(report: Dict, file_path: str) -> str:
+        """
+        Method Name: save_report
+
+        Description: This method writes the drift report as compact JSON lines. The first line is a header
+                     with the dataset metrics, the sampling info and the byte offset and length of every
+                     feature line counted from the end of the header, followed by one line per feature.
+                     Non finite floats are written as null so that the report stays standard JSON.
+
+        Output: File path of the report
+        """
+        feature_lines, index, offset = [], {}, 0
+        for col, result in report["features"].items():
+            line = json.dumps(
+                {"feature": col, **finite_values(result)}, separators=(",", ":"), allow_nan=False
+            ).encode() + b"\n"
+            index[col] = [offset, len(line)]
+            feature_lines.append(line)
+            offset += len(line)
+        header = {key: value for key, value in report.items() if key != "features"}
+        header["features"] = index
+        with open(file_path, "wb") as report_file:
+            report_file.write(
+                json.dumps(finite_values(header), separators=(",", ":"), allow_nan=False).encode() + b"\n"
+            )
+            report_file.writelines(feature_lines)
+        return file_path
+
+    @staticmethod
+    def load_report(file_path: str) -> Dict:
+        with open(file_path, "rb") as report_file:
+            header = json.loads(report_file.readline())
+            features = {}
+            for line in report_file:
+                result = json.loads(line)
+                features[result.pop("feature")] = result
+        header["features"] = features
+        return header
+
+    @staticmethod
+    def load_feature_report(file_path: str, feature: str) -> Dict:
+        """
+        Method Name: load_feature_report
+
+        Description: This method reads the drift result of one feature by seeking to its line through the
+                     header index, without parsing the other features
+
+        Output: Drift result of the feature
+        """
+        with open(file_path, "rb") as report_file:
+            header = json.loads(report_file.readline())
+            offset, length = header["features"][feature]
+            report_file.seek(report_file.tell() + offset)
+            result = json.loads(report_file.read(length))
+        result.pop("feature")
+        return result
+
+    def calculate_against_profile(self, profile: Dict, current: DataFrame) -> Dict:
+        """
+        Method Name: calculate_against_profile
+
+        Description: This method computes the drift of the current dataframe against a reference profile
+                     without the reference data. The Kolmogorov-Smirnov distance is taken over the sketch
+                     points and the categorical tests use the stored frequency tables.
+
+        Output: Drift report with per feature results and dataset metrics
+        """
+        logging.info("Entered the calculate_against_profile method of DriftEngine class")
+        try:
+            current, current_info = self.sample(current)
+            columns = [col for col in profile["columns"] if col in current.columns]
+            numerical_columns = [
+                col for col in columns if profile["columns"][col]["column_type"] == "num"
+            ]
+
+            # Distances at the sketch points, p-values of all numerical columns in one call
+            distances = self.map_features(
+                lambda col: self.profile_ks_statistic(profile["columns"][col], current[col]), numerical_columns
+            )
+            n_reference = np.array([profile["columns"][col]["n"] for col in numerical_columns], dtype=np.int64)
+            n_current = np.array([n for _, n in distances], dtype=np.int64)
+            tested = np.flatnonzero((n_reference > 0) & (n_current > 0))
+            statistics = np.array([distances[i][0] for i in tested])
+            p_values = self.ks_p_value(statistics, n_reference[tested], n_current[tested]) if len(tested) > 0 else []
+            features = {
+                numerical_columns[i]: {
+                    "column_type": "num",
+                    "stattest": "ks",
+                    "statistic": float(statistic),
+                    "p_value": float(p_value),
+                    "drift_detected": bool(p_value < self.p_value_threshold),
+                }
+                for i, statistic, p_value in zip(tested, statistics, p_values)
+            }
+            features.update(
+                (col, self.empty_result("num", "ks", n_reference[i], n_current[i]))
+                for i, col in enumerate(numerical_columns)
+                if col not in features
+            )
+
+            categorical_columns = [col for col in columns if col not in features]
+            features.update(
+                zip(
+                    categorical_columns,
+                    self.map_features(
+                        lambda col: self.profile_categorical_drift(profile["columns"][col], current[col]),
+                        categorical_columns,
+                    ),
+                )
+            )
+
+            report = self.summarise({col: features[col] for col in columns})
+            reference_info = profile.get(
+                "sampling",
+                {"rows": profile["n_rows"], "sample_size": profile["n_rows"], "cdf_error_bound": 0.0},
+            )
+            report["sampling"] = self.sampling_report(reference_info, current_info)
+            logging.info("Exited the calculate_against_profile method of DriftEngine class")
+            return report
+
+        except Exception as e:
+            raise ShippingException(e, sys) from e
+
+    @staticmethod
+    def profile_ks_statistic(column_profile: Dict, current: Series) -> Tuple[float, int]:
+        """
+        Method Name: profile_ks_statistic
+
+        Description: This method computes the Kolmogorov-Smirnov distance of the current column to the
+                     reference CDF stored at the sketch points of the profile
+
+        Output: Distance and the number of non null current values
+        """
+        values = np.sort(current.dropna().to_numpy(dtype=np.float64))
+        current_cdf = np.searchsorted(values, np.asarray(column_profile["quantiles"]), side="right") / max(
+            len(values), 1
+        )
+        statistic = float(np.max(np.abs(np.asarray(column_profile["cdf"]) - current_cdf), initial=0.0))
+        return statistic, len(values)
+
+    def profile_categorical_drift(self, column_profile: Dict, current: Series) -> Dict:
+        """
+        Method Name: profile_categorical_drift
+
+        Description: This method aligns the current category counts on the reference categories of the
+                     profile, appending unseen categories, and runs the categorical test
+
+        Output: Drift result of the column
+        """
+        frequencies = column_profile["frequencies"]
+        current_frequencies = current.dropna().astype(str).value_counts()
+        categories = list(frequencies) + [
+            category for category in current_frequencies.index if category not in frequencies
+        ]
+        reference_counts = np.array([frequencies.get(category, 0) for category in categories])
+        current_counts = current_frequencies.reindex(categories, fill_value=0).to_numpy()
+        return self.categorical_counts_drift(reference_counts, current_counts)
@@ -0,0 +1,209 @@
+import sys
+from collections import deque
+from typing import Deque, Dict, Iterable, Optional, Tuple
+import numpy as np
+from pandas import DataFrame
+from shipping_price.constant import DRIFT_MONITOR_MIN_ROWS, DRIFT_MONITOR_WINDOW_BATCHES, TARGET_COLUMN
+from shipping_price.exception import ShippingException
+from shipping_price.logger import logging
+from shipping_price.utils.drift_engine import DriftEngine
+
+# Bucket shared by all categories that are not in the reference profile
+UNSEEN_CATEGORY = "__unseen__"
+
+
+class DriftMonitor:
+    """
+    Online drift monitor for micro-batches of scoring inputs. Every feature keeps fixed size counts over
+    the reference profile, numerical values are binned between the sketch points and categories are
+    counted on the reference categories plus one unseen bucket. The counts of the last window_batches
+    micro-batches are kept in a ring buffer together with their running totals, so memory does not grow
+    with traffic and an update costs one pass over the batch plus the tests on the totals. The target is
+    not monitored, as scoring inputs do not carry it, and features absent from the window are not tested.
+    """
+
+    def __init__(
+        self,
+        profile: Dict,
+        drift_engine: Optional[DriftEngine] = None,
+        window_batches: int = DRIFT_MONITOR_WINDOW_BATCHES,
+        min_rows: int = DRIFT_MONITOR_MIN_ROWS,
+        exclude_columns: Iterable[str] = (TARGET_COLUMN,),
+    ):
+        self.profile = profile
+        self.drift_engine = drift_engine if drift_engine is not None else DriftEngine()
+        self.window_batches = window_batches
+        self.min_rows = min_rows
+
+        columns = {
+            col: column_profile for col, column_profile in profile["columns"].items() if col not in exclude_columns
+        }
+        self.numerical_columns = [
+            col for col, column_profile in columns.items() if column_profile["column_type"] == "num"
+        ]
+        self.categorical_columns = [
+            col for col, column_profile in columns.items() if column_profile["column_type"] == "cat"
+        ]
+        self.quantiles = {
+            col: np.asarray(profile["columns"][col]["quantiles"], dtype=np.float64)
+            for col in self.numerical_columns
+        }
+        self.categories = {
+            col: list(profile["columns"][col]["frequencies"]) + [UNSEEN_CATEGORY]
+            for col in self.categorical_columns
+        }
+        self.category_index = {
+            col: {category: i for i, category in enumerate(categories)}
+            for col, categories in self.categories.items()
+        }
+        self.reference_counts = {
+            col: np.array(
+                [profile["columns"][col]["frequencies"].get(category, 0) for category in self.categories[col]]
+            )
+            for col in self.categorical_columns
+        }
+
+        self.window: Deque[Tuple[int, Dict[str, np.ndarray]]] = deque()
+        self.totals = self.empty_counts()
+        self.n_batches = 0
+        self.n_rows = 0
+        self.drift_detected = False
+        self.last_report: Optional[Dict] = None
+
+    @classmethod
+    def from_profile_file(cls, file_path: str, **kwargs) -> "DriftMonitor":
+        return cls(DriftEngine.load_profile(file_path), **kwargs)
+
+    def empty_counts(self) -> Dict[str, np.ndarray]:
+        # Bin i of a numerical column counts the values between sketch points i - 1 and i
+        counts = {col: np.zeros(len(self.quantiles[col]) + 1, dtype=np.int64) for col in self.numerical_columns}
+        counts.update(
+            {col: np.zeros(len(self.categories[col]), dtype=np.int64) for col in self.categorical_columns}
+        )
+        return counts
+
+    def batch_counts(self, batch: DataFrame) -> Dict[str, np.ndarray]:
+        """
+        Method Name: batch_counts
+
+        Description: This method counts the micro-batch over the fixed bins and categories of every feature,
+                     null values are not counted as in the drift tests
+
+        Output: Counts of the micro-batch
+        """
+        counts = self.empty_counts()
+        for col in self.numerical_columns:
+            if col not in batch.columns:
+                continue
+            values = batch[col].to_numpy(dtype=np.float64)
+            values = values[~np.isnan(values)]
+            counts[col] += np.bincount(
+                np.searchsorted(self.quantiles[col], values, side="left"), minlength=len(counts[col])
+            )
+        for col in self.categorical_columns:
+            if col not in batch.columns:
+                continue
+            frequencies = batch[col].dropna().astype(str).value_counts()
+            unseen = len(self.categories[col]) - 1
+            for category, count in frequencies.items():
+                counts[col][self.category_index[col].get(category, unseen)] += count
+        return counts
+
+    def update(self, batch: DataFrame) -> bool:
+        """
+        Method Name: update
+
+        Description: This method adds a micro-batch of scoring inputs to the window, evicting the oldest
+                     micro-batch when the window is full, and re-runs the drift tests on the window once it
+                     holds min_rows rows
+
+        Output: Whether dataset drift is detected on the current window
+        """
+        try:
+            counts = self.batch_counts(batch)
+            self.window.append((len(batch), counts))
+            self.n_rows += len(batch)
+            for col in self.totals:
+                self.totals[col] += counts[col]
+            if len(self.window) > self.window_batches:
+                n_evicted, evicted = self.window.popleft()
+                self.n_rows -= n_evicted
+                for col in self.totals:
+                    self.totals[col] -= evicted[col]
+            self.n_batches += 1
+
+            if self.n_rows < self.min_rows:
+                return self.drift_detected
+
+            drift_detected = self.check()["metrics"]["dataset_drift"]
+            if drift_detected and not self.drift_detected:
+                logging.warning(
+                    f"Dataset drift detected by the drift monitor after {self.n_batches} micro-batches"
+                )
+            elif self.drift_detected and not drift_detected:
+                logging.info(f"Dataset drift cleared by the drift monitor after {self.n_batches} micro-batches")
+            self.drift_detected = drift_detected
+            return self.drift_detected
+
+        except Exception as e:
+            raise ShippingException(e, sys) from e
+
+    def check(self) -> Dict:
+        """
+        Method Name: check
+
+        Description: This method runs the drift tests of DriftEngine on the window totals. The current CDF at
+                     every sketch point is the cumulative bin count, which gives the same Kolmogorov-Smirnov
+                     distance as calculate_against_profile on the rows of the window. Features without a
+                     single value in the window are skipped.
+
+        Output: Drift report with per feature results and dataset metrics
+        """
+        try:
+            engine = self.drift_engine
+            numerical_columns, statistics, n_reference, n_current = [], [], [], []
+            for col in self.numerical_columns:
+                totals = self.totals[col]
+                n = int(totals.sum())
+                if n == 0:
+                    continue
+                numerical_columns.append(col)
+                current_cdf = np.cumsum(totals[:-1]) / max(n, 1)
+                statistics.append(
+                    float(
+                        np.max(np.abs(np.asarray(self.profile["columns"][col]["cdf"]) - current_cdf), initial=0.0)
+                    )
+                )
+                n_reference.append(self.profile["columns"][col]["n"])
+                n_current.append(n)
+            p_values = (
+                engine.ks_p_value(np.array(statistics), np.array(n_reference), np.array(n_current))
+                if len(statistics) > 0
+                else []
+            )
+            features = {
+                col: {
+                    "column_type": "num",
+                    "stattest": "ks",
+                    "statistic": statistic,
+                    "p_value": float(p_value),
+                    "drift_detected": bool(p_value < engine.p_value_threshold),
+                }
+                for col, statistic, p_value in zip(numerical_columns, statistics, p_values)
+            }
+            for col in self.categorical_columns:
+                if self.totals[col].sum() == 0:
+                    continue
+                # The unseen bucket is only tested when it is not empty
+                reference_counts, current_counts = self.reference_counts[col], self.totals[col]
+                if current_counts[-1] == 0:
+                    reference_counts, current_counts = reference_counts[:-1], current_counts[:-1]
+                features[col] = engine.categorical_counts_drift(reference_counts, current_counts)
+
+            report = engine.summarise(features)
+            report["window"] = {"n_batches": len(self.window), "n_rows": int(self.n_rows)}
+            self.last_report = report
+            return report
+
+        except Exception as e:
+            raise ShippingException(e, sys) from e
@@ -1,16 +1,11 @@
 import shutil
 import sys
 import os
-from typing import Dict, Tuple, List
-import dill
-import xgboost
+from typing import Dict, Iterator, Tuple, List
 import numpy as np
 import pandas as pd
 import yaml
 from pandas import DataFrame
-from sklearn.metrics import r2_score
-from sklearn.model_selection import GridSearchCV
-from sklearn.utils import all_estimators
 from yaml import safe_dump
 from shipping_price.constant import *
 from shipping_price.exception import ShippingException
@@ -32,13 +27,60 @@ class MainUtils:
         logging.info("Entered the write_json_to_yaml_file method of MainUtils class")
         try:
             data = json_file
-            stream = open(yaml_file_path, "w")
-            yaml.dump(data, stream)
+            with open(yaml_file_path, "w") as stream:
+                yaml.dump(data, stream)
             
         except Exception as e:
             raise ShippingException(e, sys) from e
         
     
+    def save_dataframe(self, df: DataFrame, file_path: str, dtypes: Dict = None) -> str:
+        logging.info("Entered the save_dataframe method of MainUtils class")
+        try:
+            # Casting to the schema dtypes so that every stage reads back the same types
+            if dtypes is not None:
+                df = df.astype(
+                    {col: dtype for col, dtype in dtypes.items() if col in df.columns}
+                )
+            df.to_parquet(file_path, index=False)
+            logging.info("Exited the save_dataframe method of MainUtils class")
+            return file_path
+        
+        except Exception as e:
+            raise ShippingException(e, sys) from e
+        
+        
+    def load_dataframe(
+        self, file_path: str, columns: List[str] = None, memory_map: bool = False
+    ) -> DataFrame:
+        logging.info("Entered the load_dataframe method of MainUtils class")
+        try:
+            # Only the requested columns are read from the columnar file
+            df = pd.read_parquet(file_path, columns=columns, memory_map=memory_map)
+            logging.info("Exited the load_dataframe method of MainUtils class")
+            return df
+        
+        except Exception as e:
+            raise ShippingException(e, sys) from e
+        
+    
+    def iter_dataframe_chunks(
+        self, file_path: str, columns: List[str] = None, chunk_size: int = TRANSFORMATION_CHUNK_SIZE
+    ) -> Iterator[DataFrame]:
+        # Streaming the columnar file in record batches of at most chunk_size rows
+        logging.info("Entered the iter_dataframe_chunks method of MainUtils class")
+        try:
+            import pyarrow.parquet as pq
+
+            parquet_file = pq.ParquetFile(file_path)
+            for batch in parquet_file.iter_batches(batch_size=chunk_size, columns=columns):
+                yield batch.to_pandas()
+            logging.info("Exited the iter_dataframe_chunks method of MainUtils class")
+        
+        except Exception as e:
+            raise ShippingException(e, sys) from e
+        
+    
     def save_numpy_array_data(self, file_path: str, array: np.array):
         logging.info("Entered the save_numpy_array_data method of MainUtils class")
         try:
@@ -51,9 +93,11 @@ class MainUtils:
             raise ShippingException(e, sys) from e
         
         
-    def load_numpy_array_data(self, file_path: str) -> np.array:
+    def load_numpy_array_data(self, file_path: str, mmap_mode: str = None) -> np.array:
         logging.info("Entered the load_numpy_array_data method of MainUtils class")
         try:
+            if mmap_mode is not None:
+                return np.load(file_path, mmap_mode=mmap_mode)
             with open(file_path, "rb") as file_obj:
                 return np.load(file_obj)
 
@@ -61,6 +105,41 @@ class MainUtils:
             raise ShippingException(e, sys) from e
         
     
+    def save_sparse_array_data(self, dir_path: str, array, dtype: str = TRANSFORMED_DTYPE) -> str:
+        # CSR components are saved as separate .npy files in dir_path so that each of them can be memory mapped
+        logging.info("Entered the save_sparse_array_data method of MainUtils class")
+        try:
+            from scipy import sparse
+
+            array = sparse.csr_matrix(array, dtype=dtype)
+            os.makedirs(dir_path, exist_ok=True)
+            for name in ["data", "indices", "indptr"]:
+                np.save(os.path.join(dir_path, f"{name}.npy"), getattr(array, name))
+            np.save(os.path.join(dir_path, "shape.npy"), np.array(array.shape, dtype=np.int64))
+            logging.info("Exited the save_sparse_array_data method of MainUtils class")
+            return dir_path
+        
+        except Exception as e:
+            raise ShippingException(e, sys) from e
+        
+        
+    def load_sparse_array_data(self, dir_path: str, mmap_mode: str = "r"):
+        # The CSR matrix is built on the memory mapped components without copying them
+        logging.info("Entered the load_sparse_array_data method of MainUtils class")
+        try:
+            from scipy import sparse
+
+            data, indices, indptr = (
+                np.load(os.path.join(dir_path, f"{name}.npy"), mmap_mode=mmap_mode)
+                for name in ["data", "indices", "indptr"]
+            )
+            shape = tuple(np.load(os.path.join(dir_path, "shape.npy")))
+            return sparse.csr_matrix((data, indices, indptr), shape=shape, copy=False)
+
+        except Exception as e:
+            raise ShippingException(e, sys) from e
+        
+    
     def get_tuned_model(
         self,
         model_name: str,
@@ -88,6 +167,8 @@ class MainUtils:
     def get_model_score(test_y: DataFrame, preds: DataFrame) -> float:
         logging.info("Entered the get_model_score method of MainUtils class")
         try:
+            from sklearn.metrics import r2_score
+
             model_score = r2_score(test_y, preds)
             logging.info("Model score is {}".format(model_score))
             logging.info("Exited the get_model_score method of MainUtils class")
@@ -102,8 +183,12 @@ class MainUtils:
         logging.info("Entered the get_base_model method of MainUtils class")
         try:
             if model_name.lower().startswith("xgb") is True:
+                import xgboost
+
                 model = xgboost.__dict__[model_name]()
             else:
+                from sklearn.utils import all_estimators
+
                 model_idx = [model[0] for model in all_estimators()].index(model_name)
                 model = all_estimators().__getitem__(model_idx)[1]()
             logging.info("Exited the get_base_model method of MainUtils class")
@@ -118,6 +203,8 @@ class MainUtils:
     ) -> Dict:
         logging.info("Entered the get_model_params method of MainUtils class")
         try:
+            from sklearn.model_selection import GridSearchCV
+
             VERBOSE = 3
             CV = 2
             N_JOBS = -1
@@ -140,6 +227,8 @@ class MainUtils:
     def save_object(file_path: str, obj:object) -> None:
         logging.info("Entered the save_object method of MainUtils class")
         try:
+            import dill
+
             with open(file_path, "wb") as file_obj:
                 dill.dump(obj, file_obj)
                 
@@ -167,6 +256,8 @@ class MainUtils:
     def load_object(file_path: str) -> object:
         logging.info("Entered the load_object method of MainUtils class")
         try:
+            import dill
+
             with open(file_path, "rb") as file_obj:
                 obj = dill.load(file_obj)
             logging.info("Exited the load_object method of MainUtils class")
@@ -0,0 +1,52 @@
+import numpy as np
+from sklearn.base import BaseEstimator, TransformerMixin
+
+
+class OutlierCapper(BaseEstimator, TransformerMixin):
+    """
+    Caps every continuous column to [Q1 - iqr_factor * IQR, Q3 + iqr_factor * IQR] of the data it was fitted
+    on. The quartiles of all columns are computed in one vectorized pass at fit time and columns with fewer
+    than min_unique distinct values are left as they are. The bounds are stored on the transformer, so the
+    test set and inference inputs are capped with the bounds of the train set. Quartiles and distinct
+    counts collected elsewhere, such as out of core, are applied with set_statistics.
+    """
+
+    def __init__(self, iqr_factor: float = 1.5, min_unique: int = 25):
+        self.iqr_factor = iqr_factor
+        self.min_unique = min_unique
+
+    def fit(self, X, y=None):
+        if hasattr(X, "columns"):
+            self.feature_names_in_ = np.asarray(X.columns, dtype=object)
+        X = np.asarray(X, dtype=np.float64)
+        percentile25, percentile75 = np.nanquantile(X, [0.25, 0.75], axis=0)
+
+        # Distinct values of every column from the sorted columns, nan sorts last and counts once
+        sorted_X = np.sort(X, axis=0)
+        n_unique = 1 + np.sum(
+            (sorted_X[1:] != sorted_X[:-1]) & ~(np.isnan(sorted_X[1:]) & np.isnan(sorted_X[:-1])), axis=0
+        )
+        return self.set_statistics(percentile25, percentile75, n_unique)
+
+    def set_statistics(self, percentile25: np.ndarray, percentile75: np.ndarray, n_unique: np.ndarray):
+        # Bounds from column quartiles and distinct counts, also used when they are collected out of core
+        iqr = percentile75 - percentile25
+        self.continuous_ = np.asarray(n_unique) >= self.min_unique
+        self.lower_ = np.where(self.continuous_, percentile25 - self.iqr_factor * iqr, -np.inf)
+        self.upper_ = np.where(self.continuous_, percentile75 + self.iqr_factor * iqr, np.inf)
+        self.n_features_in_ = len(self.continuous_)
+        return self
+
+    def transform(self, X):
+        X = np.asarray(X)
+        if not np.issubdtype(X.dtype, np.floating):
+            X = X.astype(np.float64)
+        # Keeping the bounds in the input dtype so that float32 inputs stay float32
+        return np.clip(X, self.lower_.astype(X.dtype), self.upper_.astype(X.dtype))
+
+    def get_feature_names_out(self, input_features=None):
+        if input_features is None:
+            input_features = getattr(
+                self, "feature_names_in_", [f"x{i}" for i in range(self.n_features_in_)]
+            )
+        return np.asarray(input_features, dtype=object)
@@ -0,0 +1,157 @@
+import math
+import sys
+from typing import Dict, Optional
+import numpy as np
+import pandas as pd
+from pandas import DataFrame
+from shipping_price.exception import ShippingException
+
+
+def required_sample_size(confidence: float, epsilon: float) -> int:
+    """
+    Method Name: required_sample_size
+
+    Description: This method gives the sample size for which, by the Dvoretzky-Kiefer-Wolfowitz inequality,
+                 the empirical CDF of a uniform sample is within epsilon of the population CDF everywhere
+                 with the given confidence
+
+    Output: Sample size
+    """
+    return int(math.ceil(math.log(2 / (1 - confidence)) / (2 * epsilon ** 2)))
+
+
+def cdf_error_bound(sample_size: int, confidence: float) -> float:
+    """
+    Method Name: cdf_error_bound
+
+    Description: This method gives the largest deviation of the empirical CDF of a uniform sample of
+                 sample_size rows from the population CDF at the given confidence, the inverse of
+                 required_sample_size
+
+    Output: Error bound
+    """
+    if sample_size <= 0:
+        return 1.0
+    return math.sqrt(math.log(2 / (1 - confidence)) / (2 * sample_size))
+
+
+class StratifiedReservoirSampler:
+    """
+    Streaming stratified sample of a sequence of dataframe chunks. Every row gets a uniform random
+    priority and each stratum keeps its sample_size rows of highest priority, which is a uniform sample
+    of the stratum at any point of the stream. Strata are combined in proportion to their row counts
+    when the sample is taken, so memory stays bounded by sample_size times the number of strata.
+    """
+
+    def __init__(self, sample_size: int, strata_column: Optional[str] = None, seed: int = 0):
+        self.sample_size = sample_size
+        self.strata_column = strata_column
+        self.rng = np.random.default_rng(seed)
+        self.reservoirs: Dict[object, DataFrame] = {}
+        self.priorities: Dict[object, np.ndarray] = {}
+        self.counts: Dict[object, int] = {}
+        self.n_rows = 0
+
+    def update(self, chunk: DataFrame) -> None:
+        try:
+            priorities = self.rng.random(len(chunk))
+            if self.strata_column is not None and self.strata_column in chunk.columns:
+                strata = chunk[self.strata_column].astype(object).where(chunk[self.strata_column].notna(), None)
+                codes, uniques = pd.factorize(strata, use_na_sentinel=False)
+            else:
+                codes, uniques = np.zeros(len(chunk), dtype=np.intp), [None]
+
+            for code, stratum in enumerate(uniques):
+                mask = codes == code
+                self.counts[stratum] = self.counts.get(stratum, 0) + int(mask.sum())
+                rows, row_priorities = chunk[mask], priorities[mask]
+                if stratum in self.reservoirs:
+                    rows = pd.concat([self.reservoirs[stratum], rows])
+                    row_priorities = np.concatenate([self.priorities[stratum], row_priorities])
+
+                # Keeping the sample_size rows of highest priority
+                if len(rows) > self.sample_size:
+                    keep = np.argpartition(-row_priorities, self.sample_size - 1)[: self.sample_size]
+                    rows, row_priorities = rows.iloc[keep], row_priorities[keep]
+                self.reservoirs[stratum] = rows
+                self.priorities[stratum] = row_priorities
+            self.n_rows += len(chunk)
+
+        except Exception as e:
+            raise ShippingException(e, sys) from e
+
+    def sample(self) -> DataFrame:
+        try:
+            if self.n_rows == 0:
+                return pd.DataFrame()
+            total = min(self.sample_size, self.n_rows)
+            parts = []
+            for stratum, rows in self.reservoirs.items():
+                # Proportional allocation, every non empty stratum keeps at least one row
+                n_stratum = max(1, int(round(total * self.counts[stratum] / self.n_rows)))
+                order = np.argsort(-self.priorities[stratum])[:n_stratum]
+                parts.append(rows.iloc[np.sort(order)])
+            return pd.concat(parts)
+
+        except Exception as e:
+            raise ShippingException(e, sys) from e
+
+
+def stratified_sample(
+    df: DataFrame, sample_size: int, strata_column: Optional[str] = None, seed: int = 0
+) -> DataFrame:
+    # Convenience wrapper for a dataframe already in memory
+    sampler = StratifiedReservoirSampler(sample_size, strata_column=strata_column, seed=seed)
+    sampler.update(df)
+    return sampler.sample()
+
+
+class QuantileSketch:
+    """
+    Mergeable quantile sketch of a stream of values. Values are kept with unit weight until more than
+    2 * size of them are held, then they are compressed to size points at evenly spaced weighted ranks,
+    each carrying the weight it stands for. Quantiles are exact while nothing has been compressed and
+    their rank error is about 1 / size per compression otherwise. Memory is bounded by 2 * size points.
+    """
+
+    def __init__(self, size: int):
+        self.size = size
+        self.values = np.array([], dtype=np.float64)
+        self.weights = np.array([], dtype=np.float64)
+        self.compressed = False
+
+    def update(self, values: np.ndarray) -> None:
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        self.values = np.concatenate([self.values, values])
+        self.weights = np.concatenate([self.weights, np.ones(len(values))])
+        if len(self.values) > 2 * self.size:
+            self.compress()
+
+    def merge(self, other: "QuantileSketch") -> None:
+        self.values = np.concatenate([self.values, other.values])
+        self.weights = np.concatenate([self.weights, other.weights])
+        self.compressed = self.compressed or other.compressed
+        if len(self.values) > 2 * self.size:
+            self.compress()
+
+    def compress(self) -> None:
+        order = np.argsort(self.values, kind="stable")
+        values, weights = self.values[order], self.weights[order]
+        cumulative = np.cumsum(weights)
+        # Each of the size points stands for an equal share of the total weight
+        ranks = (np.arange(self.size) + 0.5) * cumulative[-1] / self.size
+        self.values = values[np.minimum(np.searchsorted(cumulative, ranks), len(values) - 1)]
+        self.weights = np.full(self.size, cumulative[-1] / self.size)
+        self.compressed = True
+
+    def quantile(self, q) -> np.ndarray:
+        if len(self.values) == 0:
+            return np.full(np.shape(q), np.nan)
+        if not self.compressed:
+            return np.quantile(self.values, q)
+        order = np.argsort(self.values, kind="stable")
+        values, weights = self.values[order], self.weights[order]
+        # Weighted ranks of the points, taken at the middle of the weight they stand for
+        positions = (np.cumsum(weights) - weights / 2) / weights.sum()
+        return np.interp(q, positions, values)
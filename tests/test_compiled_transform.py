@@ -0,0 +1,138 @@
+import numpy as np
+import pandas as pd
+import pytest
+from benchmarks.synthetic_data import generate_shipments
+from shipping_price.components.data_transformation import DataTransformation
+from shipping_price.components.model_trainer import CostModel
+from shipping_price.constant import TARGET_COLUMN
+from shipping_price.entity.artifacts_entity import DataIngestionArtifacts
+from shipping_price.entity.config_entity import DataTransformationConfig
+from shipping_price.utils.compiled_transform import UNKNOWN_CATEGORY, CompiledTransform
+
+
+def assert_same_output(expected, output):
+    # Same container, same stored entries and bit for bit the same values, nan included
+    assert type(expected) is type(output)
+    if hasattr(expected, "toarray"):
+        expected, output = expected.tocsr(), output.tocsr()
+        expected.sort_indices()
+        output.sort_indices()
+        np.testing.assert_array_equal(expected.indptr, output.indptr)
+        np.testing.assert_array_equal(expected.indices, output.indices)
+        expected, output = expected.data, output.data
+    assert expected.dtype == output.dtype
+    assert np.array_equal(expected, output, equal_nan=True)
+
+
+@pytest.fixture(scope="module")
+def config():
+    return DataTransformationConfig()
+
+
+@pytest.fixture(scope="module")
+def train_set(config):
+    schema_config = config.SCHEMA_CONFIG
+    # International is both one-hot and binary encoded
+    columns = dict.fromkeys(
+        schema_config["onehot_columns"] + schema_config["binary_columns"] + schema_config["numerical_columns"]
+    )
+    return generate_shipments(3000, seed=11).dropna()[list(columns) + [TARGET_COLUMN]]
+
+
+@pytest.fixture(scope="module")
+def preprocessor(config, train_set):
+    data_transformation = DataTransformation(DataIngestionArtifacts(None, None), config)
+    return data_transformation.get_data_transformer_object().fit(train_set.drop(columns=[TARGET_COLUMN]))
+
+
+@pytest.fixture(scope="module")
+def compiled(preprocessor):
+    return CompiledTransform.compile(preprocessor)
+
+
+@pytest.fixture()
+def features(train_set):
+    return train_set.drop(columns=[TARGET_COLUMN]).head(200).reset_index(drop=True).astype(
+        {col: object for col in train_set.columns if train_set[col].dtype != np.float64}
+    )
+
+
+def test_dataframe_parity(preprocessor, compiled, features):
+    assert_same_output(preprocessor.transform(features), compiled.transform(features))
+
+
+def test_float32_dataframe_parity(preprocessor, compiled, features):
+    # Numerical columns are float32 after the ingestion memory plan
+    features = features.astype({col: np.float32 for col in compiled.numerical_columns})
+    assert_same_output(preprocessor.transform(features), compiled.transform(features))
+
+
+def test_unseen_categories(preprocessor, compiled, config, features):
+    for col in config.SCHEMA_CONFIG["onehot_columns"]:
+        features.loc[::3, col] = UNKNOWN_CATEGORY
+    assert_same_output(preprocessor.transform(features), compiled.transform(features))
+
+
+def test_missing_values(preprocessor, compiled, config, features):
+    for i, col in enumerate(config.SCHEMA_CONFIG["onehot_columns"]):
+        features.loc[i::4, col] = None if i % 2 == 0 else np.nan
+    for col in compiled.numerical_columns:
+        features.loc[::5, col] = np.nan
+    assert_same_output(preprocessor.transform(features), compiled.transform(features))
+
+
+def test_values_beyond_outlier_bounds(preprocessor, compiled, features):
+    capper = preprocessor.named_transformers_["numerical"].named_steps["outliercapper"]
+    continuous = [col for col, is_continuous in zip(compiled.numerical_columns, capper.continuous_) if is_continuous]
+    assert len(continuous) > 0
+    for col in continuous:
+        j = compiled.numerical_columns.index(col)
+        features.loc[0::2, col] = capper.lower_[j] - 1e6
+        features.loc[1::2, col] = capper.upper_[j] + 1e6
+    expected = preprocessor.transform(features)
+    assert_same_output(expected, compiled.transform(features))
+    # The capped rows all land on the bounds
+    numerical = expected.toarray()[:, compiled.numerical_offset :]
+    j = compiled.numerical_columns.index(continuous[0])
+    assert len(np.unique(numerical[0::2, j])) == 1
+    assert len(np.unique(numerical[1::2, j])) == 1
+
+
+def test_record_and_array_inputs(preprocessor, compiled, features):
+    expected = preprocessor.transform(features)
+    assert_same_output(expected, compiled.transform(features.to_dict("records")))
+    assert_same_output(expected, compiled.transform(features[compiled.feature_names_in].to_numpy(dtype=object)))
+    record = features.iloc[0].to_dict()
+    assert_same_output(preprocessor.transform(pd.DataFrame([record])), compiled.transform(record))
+
+
+def test_check_parity(preprocessor, compiled):
+    assert compiled.check_parity(preprocessor)
+    perturbed = CompiledTransform.compile(preprocessor)
+    perturbed.numerical_steps["mean"] = perturbed.numerical_steps["mean"] + 1e-9
+    assert not perturbed.check_parity(preprocessor)
+
+
+@pytest.mark.parametrize("dtype", ["category", object])
+def test_fitted_with_missing_categories(config, dtype):
+    # Nulls are nan in category columns and None in object columns, the one-hot encoder keeps the kind it saw
+    train_set = generate_shipments(3000, seed=11)[config.MODEL_COLUMNS]
+    train_set = train_set.astype({col: dtype for col in train_set.columns if train_set[col].dtype == object})
+    features = train_set.drop(columns=[TARGET_COLUMN])
+    assert features[config.SCHEMA_CONFIG["onehot_columns"]].isna().any().any()
+    data_transformation = DataTransformation(DataIngestionArtifacts(None, None), config)
+    preprocessor = data_transformation.get_data_transformer_object().fit(features)
+    compiled = CompiledTransform.compile(preprocessor)
+    assert compiled.check_parity(preprocessor)
+    assert_same_output(preprocessor.transform(features), compiled.transform(features))
+
+
+def test_cost_model_predictions(preprocessor, compiled, train_set, features):
+    from sklearn.tree import DecisionTreeRegressor
+
+    x_train = preprocessor.transform(train_set.drop(columns=[TARGET_COLUMN]))
+    model = DecisionTreeRegressor(max_depth=6, random_state=0).fit(x_train, train_set[TARGET_COLUMN])
+    cost_model = CostModel(preprocessor, model, compiled)
+    compiled_predictions = cost_model.predict(features)
+    cost_model.use_compiled_transform = False
+    np.testing.assert_array_equal(compiled_predictions, cost_model.predict(features))
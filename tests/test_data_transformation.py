@@ -0,0 +1,62 @@
+import numpy as np
+import pandas as pd
+import pytest
+from benchmarks.synthetic_data import generate_shipments
+from shipping_price.components.data_transformation import DataTransformation
+from shipping_price.entity.artifacts_entity import DataIngestionArtifacts
+from shipping_price.entity.config_entity import DataTransformationConfig
+from shipping_price.utils.column_statistics import compute_column_statistics, save_column_statistics
+
+
+@pytest.fixture(scope="module")
+def config():
+    config = DataTransformationConfig()
+    # Several chunks per pass and a sketch large enough to keep the quartiles exact
+    config.CHUNK_SIZE = 500
+    config.OUTLIER_SKETCH_SIZE = 10000
+    return config
+
+
+@pytest.fixture(scope="module")
+def shipments(config):
+    # Nulls in the categorical and numerical columns, numerical columns in float32 as after ingestion
+    df = generate_shipments(3000, seed=7)[config.MODEL_COLUMNS]
+    return df.astype({col: np.float32 for col in config.SCHEMA_CONFIG["numerical_columns"]})
+
+
+@pytest.fixture(params=["object", "category"])
+def ingestion_artifacts(request, shipments, tmp_path):
+    df = shipments.astype({col: request.param for col in shipments.columns if shipments[col].dtype == object})
+    train_file_path, test_file_path = str(tmp_path / "train.parquet"), str(tmp_path / "test.parquet")
+    df.iloc[:2400].to_parquet(train_file_path, index=False)
+    df.iloc[2400:].to_parquet(test_file_path, index=False)
+    return DataIngestionArtifacts(train_file_path, test_file_path)
+
+
+def assert_same_transform(data_transformation, ingestion_artifacts):
+    utils = data_transformation.data_transformation_config.UTILS
+    train_set = utils.load_dataframe(ingestion_artifacts.train_data_file_path)
+    test_set = utils.load_dataframe(ingestion_artifacts.test_data_file_path)
+    assert train_set.isna().any().any()
+
+    in_memory = data_transformation.get_data_transformer_object().fit(train_set)
+    out_of_core = data_transformation.fit_out_of_core(data_transformation.get_data_transformer_object())
+    np.testing.assert_array_equal(in_memory.get_feature_names_out(), out_of_core.get_feature_names_out())
+    for df in (train_set, test_set):
+        np.testing.assert_allclose(
+            out_of_core.transform(df).toarray(), in_memory.transform(df).toarray(), rtol=1e-6, atol=1e-6
+        )
+
+
+def test_chunked_matches_in_memory(config, ingestion_artifacts):
+    assert_same_transform(DataTransformation(ingestion_artifacts, config), ingestion_artifacts)
+
+
+def test_chunked_from_column_statistics_matches_in_memory(config, ingestion_artifacts, tmp_path):
+    train_set = pd.read_parquet(ingestion_artifacts.train_data_file_path)
+    ingestion_artifacts.column_statistics_file_path = save_column_statistics(
+        {"train": compute_column_statistics(train_set), "test": {}}, str(tmp_path / "column_statistics.json")
+    )
+    data_transformation = DataTransformation(ingestion_artifacts, config)
+    assert data_transformation.column_statistics is not None
+    assert_same_transform(data_transformation, ingestion_artifacts)